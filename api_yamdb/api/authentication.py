@@ -0,0 +1,179 @@
+import threading
+import time
+from collections import OrderedDict
+from hashlib import sha256
+
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import (AuthenticationFailed,
+                                                 InvalidToken)
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from reviews import versions
+
+User = get_user_model()
+
+VERSION_CLAIM = 'user_version'
+# Сколько пользователей с устаревшими токенами держать в памяти процесса
+MAX_CACHED_USERS = 10000
+# Сколько проверенных токенов держать в памяти процесса
+MAX_CACHED_TOKENS = 10000
+
+
+def load_claims(user_id):
+    """Значения User.TOKEN_CLAIM_FIELDS из БД; None, если пользователя нет."""
+    return User.objects.filter(pk=user_id).values_list(
+        *User.TOKEN_CLAIM_FIELDS).first()
+
+
+def build_user(user_id, claims):
+    """User только с id и полями claims, остальные поля отложены."""
+    values = dict(zip(User.TOKEN_CLAIM_FIELDS, claims), id=user_id)
+    # from_db ожидает значения в порядке полей модели
+    field_names = [
+        field.attname for field in User._meta.concrete_fields
+        if field.attname in values
+    ]
+    return User.from_db(
+        DEFAULT_DB_ALIAS, field_names,
+        [values[name] for name in field_names])
+
+
+class ClaimsAccessToken(AccessToken):
+    """Access-токен с ролью пользователя и версией versions.user(id)."""
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        # Версия читается до полей: если роль изменится между ними,
+        # токен получит уже устаревшую версию, а не новую со старой ролью
+        token[VERSION_CLAIM], _modified = versions.ensure_version(
+            versions.user(user.pk))
+        claims = load_claims(user.pk)
+        for name, value in zip(User.TOKEN_CLAIM_FIELDS, claims):
+            token[name] = value
+        return token
+
+
+class ClaimsCache:
+    """Процессный LRU-кэш id -> (версия, значения claims) для токенов,
+    выданных до изменения пользователя."""
+
+    def __init__(self, max_size=MAX_CACHED_USERS):
+        self.max_size = max_size
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+
+    def get(self, user_id, version):
+        with self.lock:
+            entry = self.entries.get(user_id)
+            if entry is not None and entry[0] == version:
+                self.entries.move_to_end(user_id)
+                return entry[1]
+        claims = load_claims(user_id)
+        if claims is None:
+            return None
+        with self.lock:
+            self.entries[user_id] = (version, claims)
+            self.entries.move_to_end(user_id)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+        return claims
+
+
+claims_cache = ClaimsCache()
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication без запроса User на каждый запрос.
+
+    Пользователь собирается через User.from_db из claims токена, пока
+    версия versions.user(id) совпадает с записанной в токене. Версия
+    читается из БД на каждом запросе: после смены роли, username или
+    активности в любом процессе поля берутся из claims_cache или из БД,
+    поэтому изменение действует сразу. Без записи о версии поля всегда
+    читаются из БД.
+    Остальные поля пользователя отложены и загружаются при обращении.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(
+                _('Token contained no recognizable user identification'))
+        version, modified = versions.get_version(versions.user(user_id))
+        if (version, modified) == versions.MISSING:
+            # Версию нечем подтвердить (запись удалена вместе с
+            # пользователем или потеряна): поля только из БД
+            claims = load_claims(user_id)
+        elif validated_token.get(VERSION_CLAIM) == version:
+            claims = tuple(
+                validated_token[name] for name in User.TOKEN_CLAIM_FIELDS)
+        else:
+            claims = claims_cache.get(user_id, version)
+        if claims is None:
+            raise AuthenticationFailed(
+                _('User not found'), code='user_not_found')
+        user = build_user(user_id, claims)
+        if not user.is_active:
+            raise AuthenticationFailed(
+                _('User is inactive'), code='user_inactive')
+        return user
+
+
+class VerifiedTokenCache:
+    """Процессный LRU-кэш sha256(токен) -> проверенный токен.
+
+    Запись действует строго до exp токена: simplejwt считает токен
+    истекшим, когда exp <= текущего времени, и кэш отдает запись, только
+    пока time.time() < exp. После этого токен проверяется заново и
+    отклоняется обычной ошибкой simplejwt.
+    """
+
+    def __init__(self, max_size=MAX_CACHED_TOKENS):
+        self.max_size = max_size
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+
+    def get(self, digest):
+        with self.lock:
+            entry = self.entries.get(digest)
+            if entry is None:
+                return None
+            expires_at, token = entry
+            if time.time() >= expires_at:
+                del self.entries[digest]
+                return None
+            self.entries.move_to_end(digest)
+            return token
+
+    def add(self, digest, token):
+        with self.lock:
+            self.entries[digest] = (token['exp'], token)
+            self.entries.move_to_end(digest)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+
+verified_tokens = VerifiedTokenCache()
+
+
+class CachedClaimsJWTAuthentication(ClaimsJWTAuthentication):
+    """ClaimsJWTAuthentication, которая проверяет подпись и декодирует
+    токен один раз, а при повторных запросах с тем же токеном берет
+    claims из verified_tokens. Версия пользователя по-прежнему сверяется
+    на каждом запросе. Сравнение скорости - команда
+    benchmark_authentication.
+    """
+
+    def get_validated_token(self, raw_token):
+        digest = sha256(raw_token).digest()
+        token = verified_tokens.get(digest)
+        if token is None:
+            token = super().get_validated_token(raw_token)
+            verified_tokens.add(digest, token)
+        return token
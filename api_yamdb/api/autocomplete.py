@@ -0,0 +1,116 @@
+import re
+import threading
+import time
+from bisect import bisect_left
+
+from reviews import versions
+from reviews.lookups import VERSION_CHECK_INTERVAL
+from reviews.models import Category, Genre, Title
+
+WORD_START_RE = re.compile(r'(?<!\w)\w')
+VERSION_KEYS = (versions.NAMES, )
+
+
+def normalize(text):
+    return ' '.join(text.lower().replace('ё', 'е').split())
+
+
+class PrefixIndex:
+    """Отсортированный список нормализованных имен для поиска по префиксу.
+
+    Каждое имя индексируется с начала каждого слова, поэтому «туда»
+    находит «Поворот туда».
+    """
+
+    def __init__(self, items):
+        entries = []
+        for position, (name, item) in enumerate(items):
+            normalized = normalize(name)
+            for match in WORD_START_RE.finditer(normalized):
+                entries.append((normalized[match.start():], position))
+        entries.sort()
+        self.keys = [key for key, _ in entries]
+        self.positions = [position for _, position in entries]
+        self.items = [item for _, item in items]
+
+    def search(self, prefix, limit):
+        found = []
+        index = bisect_left(self.keys, prefix)
+        while index < len(self.keys) and len(found) < limit:
+            if not self.keys[index].startswith(prefix):
+                break
+            position = self.positions[index]
+            if position not in found:
+                found.append(position)
+            index += 1
+        return [self.items[position] for position in sorted(found)]
+
+
+class CatalogAutocomplete:
+    """Процессный индекс имен произведений, жанров и категорий.
+
+    Строится лениво при первом запросе и перестраивается, когда меняется
+    версия names (см. reviews/versions.py). Ее меняют только имена и slug,
+    но не отзывы и рейтинги. Версия сверяется не чаще раза в
+    VERSION_CHECK_INTERVAL секунд, поэтому обычный запрос не обращается
+    к БД.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version = None
+        self.checked_at = None
+        self.indexes = None
+
+    def invalidate(self):
+        self.checked_at = None
+        self.version = None
+
+    def build(self):
+        return {
+            'titles': PrefixIndex([
+                (name, {'id': pk, 'name': name})
+                for pk, name in Title.objects.order_by(
+                    'name').values_list('id', 'name')
+            ]),
+            'genres': PrefixIndex([
+                (name, {'name': name, 'slug': slug})
+                for name, slug in Genre.objects.order_by(
+                    'name').values_list('name', 'slug')
+            ]),
+            'categories': PrefixIndex([
+                (name, {'name': name, 'slug': slug})
+                for name, slug in Category.objects.order_by(
+                    'name').values_list('name', 'slug')
+            ]),
+        }
+
+    def get_indexes(self):
+        now = time.monotonic()
+        if (
+            self.checked_at is not None
+            and now - self.checked_at < VERSION_CHECK_INTERVAL
+        ):
+            return self.indexes
+        version = [token for token, _ in versions.get_versions(*VERSION_KEYS)]
+        if version != self.version:
+            with self.lock:
+                if version != self.version:
+                    self.indexes = self.build()
+                    self.version = version
+        self.checked_at = now
+        return self.indexes
+
+    def suggest(self, query, limit):
+        prefix = normalize(query)
+        if not prefix:
+            return {kind: [] for kind in ('titles', 'genres', 'categories')}
+        return {
+            kind: index.search(prefix, limit)
+            for kind, index in self.get_indexes().items()
+        }
+
+
+catalog_autocomplete = CatalogAutocomplete()
+for key in VERSION_KEYS:
+    versions.subscribe(key, catalog_autocomplete.invalidate)
@@ -0,0 +1,66 @@
+import csv
+import json
+
+EXPORT_CHUNK_SIZE = 500
+NDJSON = 'ndjson'
+CSV = 'csv'
+CONTENT_TYPES = {
+    NDJSON: 'application/x-ndjson',
+    CSV: 'text/csv; charset=utf-8',
+}
+
+
+def iterate_in_chunks(queryset, chunk_size=None):
+    """Отдает объекты queryset порциями по chunk_size, упорядочив по id.
+
+    iterator() в Django 2.2 не выполняет prefetch_related, поэтому каждая
+    порция - отдельный запрос с условием id > последнего id и своими
+    prefetch-запросами. В памяти одновременно только одна порция.
+    """
+    chunk_size = chunk_size or EXPORT_CHUNK_SIZE
+    queryset = queryset.order_by('pk')
+    last_pk = None
+    while True:
+        chunk = queryset if last_pk is None else queryset.filter(
+            pk__gt=last_pk)
+        rows = list(chunk[:chunk_size])
+        yield from rows
+        if len(rows) < chunk_size:
+            return
+        last_pk = rows[-1].pk
+
+
+def ndjson_lines(serializer, rows):
+    for row in rows:
+        yield json.dumps(
+            serializer.to_representation(row), ensure_ascii=False) + '\n'
+
+
+class Echo:
+    """Файлоподобный объект для csv.writer, возвращающий записанную строку."""
+
+    def write(self, value):
+        return value
+
+
+def flatten(value):
+    # Вложенные категория и жанры выводятся по slug
+    if value is None:
+        return ''
+    if isinstance(value, dict):
+        return value.get('slug', '')
+    if isinstance(value, list):
+        return ','.join(flatten(item) for item in value)
+    return value
+
+
+def csv_lines(serializer, rows):
+    writer = csv.writer(Echo())
+    names = list(serializer.fields)
+    yield writer.writerow(names)
+    for row in rows:
+        data = serializer.to_representation(row)
+        yield writer.writerow([flatten(data[name]) for name in names])
+
+
+RENDERERS = {NDJSON: ndjson_lines, CSV: csv_lines}
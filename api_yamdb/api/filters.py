@@ -1,13 +1,132 @@
+from django import forms
+from django.db import connection
+from django.db.models import Case, F, IntegerField, When
 from django_filters import rest_framework as filters
+from rest_framework.exceptions import ValidationError
 
+from reviews import lookups
 from reviews.models import Title
+from reviews.search import search_titles
+from reviews.trigrams import fuzzy_search_titles
+
+GENRE_MATCH_ANY = 'any'
+GENRE_MATCH_ALL = 'all'
+MAX_TITLE_IDS = 100
+
+
+def filter_exists(queryset, related, related_field, field=None):
+    """Добавляет WHERE EXISTS (related, где related_field = field).
+
+    По умолчанию related_field сравнивается с первичным ключом queryset.
+
+    filter(Exists(...)) появился только в Django 3.0, а аннотация Exists
+    попадает в SELECT и заставляет COUNT пагинации оборачиваться
+    в подзапрос с полным просмотром таблицы.
+    """
+    quote = connection.ops.quote_name
+    outer = queryset.model._meta
+    inner = related.model._meta
+    field = outer.pk if field is None else outer.get_field(field)
+    correlation = '{}.{} = {}.{}'.format(
+        quote(inner.db_table), quote(inner.get_field(related_field).column),
+        quote(outer.db_table), quote(field.column),
+    )
+    sql, params = related.extra(where=[correlation]).order_by().values(
+        'pk').query.sql_with_params()
+    return queryset.extra(where=[f'EXISTS ({sql})'], params=params)
+
+
+class CharInFilter(filters.BaseInFilter, filters.CharFilter):
+    pass
+
+
+class IntegerInFilter(filters.BaseInFilter, filters.NumberFilter):
+    field_class = forms.IntegerField
 
 
 class TitleFilter(filters.FilterSet):
-    category = filters.CharFilter(field_name='category__slug')
-    genre = filters.CharFilter(field_name='genre__slug')
+    ids = IntegerInFilter(method='filter_ids')
+    category = CharInFilter(method='filter_category')
+    genre = CharInFilter(method='filter_genre')
+    genre_match = filters.ChoiceFilter(
+        choices=((GENRE_MATCH_ANY, 'any'), (GENRE_MATCH_ALL, 'all')),
+        method='filter_genre_match'
+    )
     name = filters.CharFilter(field_name='name', lookup_expr='icontains')
+    year_min = filters.NumberFilter(field_name='year', lookup_expr='gte')
+    year_max = filters.NumberFilter(field_name='year', lookup_expr='lte')
+    rating_min = filters.NumberFilter(method='filter_rating_min')
+    rating_max = filters.NumberFilter(method='filter_rating_max')
+    search = filters.CharFilter(method='filter_search')
+    fuzzy = filters.CharFilter(method='filter_fuzzy')
 
     class Meta:
         model = Title
-        fields = ('category', 'genre', 'name', 'year', )
+        fields = (
+            'ids', 'category', 'genre', 'genre_match', 'name', 'year',
+            'year_min', 'year_max', 'rating_min', 'rating_max',
+            'search', 'fuzzy',
+        )
+
+    def filter_ids(self, queryset, name, value):
+        ids = list(dict.fromkeys(pk for pk in value if pk is not None))
+        if len(ids) > MAX_TITLE_IDS:
+            raise ValidationError(
+                {name: [f'Не больше {MAX_TITLE_IDS} id за запрос.']})
+        # Произведения возвращаются в порядке id в запросе
+        return queryset.filter(pk__in=ids).annotate(
+            ids_position=Case(
+                *(When(pk=pk, then=position)
+                  for position, pk in enumerate(ids)),
+                output_field=IntegerField()
+            )
+        ).order_by('ids_position')
+
+    def filter_category(self, queryset, name, value):
+        # id по slug из процессного снимка: условие на колонке category_id
+        # без JOIN и подзапроса
+        return queryset.filter(
+            category_id__in=lookups.categories.ids_by_slug(value).values())
+
+    def filter_genre(self, queryset, name, value):
+        # EXISTS вместо JOIN: строки не дублируются без DISTINCT, а SQLite
+        # читает произведения по индексу сортировки и проверяет жанр
+        # по (title_id, genre_id)
+        ids = lookups.genres.ids_by_slug(value)
+        if not ids:
+            # genre_id IN () не компилируется в подзапрос EXISTS
+            return queryset.none()
+        genres = Title.genre.through.objects
+        if self.form.cleaned_data.get('genre_match') != GENRE_MATCH_ALL:
+            return filter_exists(
+                queryset, genres.filter(genre_id__in=ids.values()), 'title')
+        if len(ids) < len(set(value)):
+            return queryset.none()
+        for genre_id in ids.values():
+            queryset = filter_exists(
+                queryset, genres.filter(genre_id=genre_id), 'title')
+        return queryset
+
+    def filter_genre_match(self, queryset, name, value):
+        # Учитывается в filter_genre
+        return queryset
+
+    def filter_rating_min(self, queryset, name, value):
+        # rating = rating_sum / rating_count; умножение вместо деления
+        # оставляет условие на колонках строки
+        return queryset.filter(
+            rating_count__gt=0,
+            rating_sum__gte=float(value) * F('rating_count')
+        )
+
+    def filter_rating_max(self, queryset, name, value):
+        return queryset.filter(
+            rating_count__gt=0,
+            rating_sum__lte=float(value) * F('rating_count')
+        )
+
+    def filter_search(self, queryset, name, value):
+        return search_titles(queryset, value)
+
+    def filter_fuzzy(self, queryset, name, value):
+        return fuzzy_search_titles(queryset, value)
@@ -0,0 +1,63 @@
+from time import perf_counter
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from api.authentication import (CachedClaimsJWTAuthentication,
+                                ClaimsAccessToken, ClaimsJWTAuthentication)
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = """Compares per-request authentication overhead of simplejwt
+    JWTAuthentication, ClaimsJWTAuthentication (no user query) and
+    CachedClaimsJWTAuthentication (verified-token cache) for one token.
+    The user is created in a transaction that is rolled back."""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests', type=int, default=2000,
+            help='Number of authenticated requests per run')
+        parser.add_argument(
+            '--repeat', type=int, default=5,
+            help='Number of timed runs, the best one is reported')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            try:
+                user = User.objects.create(
+                    username='benchmark-user',
+                    email='benchmark-user@yamdb.fake', role='admin')
+                token = str(ClaimsAccessToken.for_user(user))
+                request = APIRequestFactory().get(
+                    '/', HTTP_AUTHORIZATION=f'Bearer {token}')
+                for authentication_class in (
+                    JWTAuthentication,
+                    ClaimsJWTAuthentication,
+                    CachedClaimsJWTAuthentication,
+                ):
+                    self.benchmark(
+                        authentication_class(), request, user,
+                        options['requests'], options['repeat'])
+            finally:
+                transaction.set_rollback(True)
+
+    def benchmark(self, authentication, request, user, count, repeat):
+        authenticated, _ = authentication.authenticate(request)
+        if (authenticated.pk, authenticated.role) != (user.pk, user.role):
+            raise CommandError(
+                f'{type(authentication).__name__}: wrong user')
+        best = None
+        for _ in range(repeat):
+            started = perf_counter()
+            for _ in range(count):
+                authentication.authenticate(request)
+            elapsed = perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        self.stdout.write(
+            f'{type(authentication).__name__}: '
+            f'{best / count * 1e6:.1f} us per request')
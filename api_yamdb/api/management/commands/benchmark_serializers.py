@@ -0,0 +1,120 @@
+from time import perf_counter
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from api.mixins import build_loading_plan
+from api.serializers import (CommentSerializer, ReviewSerializer,
+                             TitleReadSerializer)
+from reviews import lookups
+from reviews.models import Category, Comment, Genre, Review, Title
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = """Compares DRF to_representation with the compiled fast path
+    (api/compiled.py) on generated titles, reviews and comments.
+    The data is created in a transaction that is rolled back."""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--titles', type=int, default=500,
+            help='Number of generated titles (one review and comment each)')
+        parser.add_argument(
+            '--repeat', type=int, default=5,
+            help='Number of timed runs, the best one is reported')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.create_data(options['titles'])
+            try:
+                for serializer_class, queryset in (
+                    (TitleReadSerializer, Title.objects.all()),
+                    (ReviewSerializer, Review.objects.all()),
+                    (CommentSerializer, Comment.objects.all()),
+                ):
+                    self.benchmark(
+                        serializer_class, queryset, options['repeat'])
+            finally:
+                transaction.set_rollback(True)
+                lookups.categories.invalidate()
+                lookups.genres.invalidate()
+
+    def create_data(self, count):
+        categories = Category.objects.bulk_create(
+            Category(name=f'Категория {index}', slug=f'bench-category-{index}')
+            for index in range(5))
+        Genre.objects.bulk_create(
+            Genre(name=f'Жанр {index}', slug=f'bench-genre-{index}')
+            for index in range(10))
+        category_ids = list(Category.objects.filter(
+            slug__startswith='bench-').values_list('id', flat=True))
+        genre_ids = list(Genre.objects.filter(
+            slug__startswith='bench-').values_list('id', flat=True))
+        Title.objects.bulk_create(
+            Title(
+                name=f'Бенчмарк {index}', year=2000,
+                description='Описание ' * 20,
+                category_id=category_ids[index % len(categories)],
+                rating_sum=7, rating_count=1,
+            )
+            for index in range(count))
+        title_ids = list(Title.objects.filter(
+            name__startswith='Бенчмарк ').values_list('id', flat=True))
+        Title.genre.through.objects.bulk_create(
+            Title.genre.through(title_id=title_id, genre_id=genre_id)
+            for index, title_id in enumerate(title_ids)
+            for genre_id in (
+                genre_ids[index % len(genre_ids)],
+                genre_ids[(index + 1) % len(genre_ids)]))
+        author = User.objects.create(
+            username='benchmark-author', email='benchmark@yamdb.fake')
+        Review.objects.bulk_create(
+            Review(
+                title_id=title_id, author=author, score=7,
+                text='Текст ' * 50)
+            for title_id in title_ids)
+        Comment.objects.bulk_create(
+            Comment(review_id=review_id, author=author, text='Комментарий')
+            for review_id in Review.objects.filter(
+                author=author).values_list('id', flat=True))
+        # Строки еще не закоммичены, поэтому в снимок справочников они
+        # попадают только принудительным перечитыванием
+        for snapshot in (lookups.categories, lookups.genres):
+            snapshot.invalidate()
+            snapshot.refresh()
+
+    def benchmark(self, serializer_class, queryset, repeat):
+        serializer = serializer_class(many=True)
+        plan = build_loading_plan(queryset.model, serializer.child)
+        rows = list(plan.apply(queryset))
+        timings, outputs = {}, {}
+        default = serializer_class.__dict__.get('compiled')
+        try:
+            for compiled in (False, True):
+                serializer_class.compiled = compiled
+                best = None
+                for _ in range(repeat):
+                    serializer = serializer_class(rows, many=True)
+                    started = perf_counter()
+                    data = serializer.data
+                    elapsed = perf_counter() - started
+                    best = elapsed if best is None else min(best, elapsed)
+                timings[compiled] = best
+                outputs[compiled] = JSONRenderer().render(data)
+        finally:
+            if default is None:
+                del serializer_class.compiled
+            else:
+                serializer_class.compiled = default
+        if outputs[False] != outputs[True]:
+            raise CommandError(
+                f'{serializer_class.__name__}: output differs')
+        self.stdout.write(
+            f'{serializer_class.__name__}: {len(rows)} rows, '
+            f'DRF {timings[False] * 1000:.1f} ms, '
+            f'compiled {timings[True] * 1000:.1f} ms, '
+            f'x{timings[False] / timings[True]:.1f}, output identical')
@@ -0,0 +1,326 @@
+from calendar import timegm
+from hashlib import md5
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+from rest_framework.relations import ManyRelatedField, RelatedField
+
+from reviews import versions
+
+EAGER_LOADING_HEADER = 'X-Eager-Loading-Plan'
+
+
+class LoadingPlan:
+    """select_related/prefetch_related/only() для одной модели."""
+
+    def __init__(self, model):
+        self.model = model
+        self.select_related = set()
+        self.prefetches = {}
+        # None означает, что набор колонок определить не удалось
+        self.only = {model._meta.pk.name}
+
+    def add_only(self, *names):
+        if self.only is not None:
+            self.only.update(names)
+
+    def disable_only(self):
+        self.only = None
+
+    def apply(self, queryset):
+        if self.select_related:
+            queryset = queryset.select_related(*sorted(self.select_related))
+        for lookup, plan in sorted(self.prefetches.items()):
+            related_model = plan.model
+            queryset = queryset.prefetch_related(Prefetch(
+                lookup,
+                queryset=plan.apply(related_model._default_manager.all())
+            ))
+        if self.only is not None:
+            queryset = queryset.only(*sorted(self.only))
+        return queryset
+
+    def __str__(self):
+        parts = []
+        if self.select_related:
+            parts.append(
+                'select_related=' + ','.join(sorted(self.select_related)))
+        for lookup, plan in sorted(self.prefetches.items()):
+            parts.append(f'prefetch_related={lookup}({plan})')
+        parts.append(
+            'only=' + ('*' if self.only is None
+                       else ','.join(sorted(self.only))))
+        return '; '.join(parts)
+
+
+def get_model_field(model, name):
+    try:
+        return model._meta.get_field(name)
+    except FieldDoesNotExist:
+        return None
+
+
+def plan_source(plan, model, source_attrs, prefix=''):
+    """Добавляет в план колонки и связи, нужные для чтения source_attrs.
+
+    Возвращает (модель, поле) последнего атрибута или (None, None),
+    если атрибут не является полем модели.
+    """
+    for index, attr in enumerate(source_attrs):
+        field = get_model_field(model, attr)
+        path = prefix + attr
+        if field is None:
+            dependencies = getattr(model, 'property_dependencies', {})
+            if attr in dependencies and index == len(source_attrs) - 1:
+                plan.add_only(*(prefix + name for name in dependencies[attr]))
+            else:
+                plan.disable_only()
+            return None, None
+        if index == len(source_attrs) - 1:
+            if field.concrete and not field.many_to_many:
+                plan.add_only(path)
+            return model, field
+        if not (field.many_to_one or field.one_to_one) or not field.concrete:
+            plan.disable_only()
+            return None, None
+        plan.select_related.add(path)
+        plan.add_only(path, f'{path}__{field.related_model._meta.pk.name}')
+        model = field.related_model
+        prefix = path + '__'
+    return None, None
+
+
+def walk_serializer(plan, serializer, model, prefix=''):
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+        if field.source == '*':
+            plan.disable_only()
+            continue
+        attrs = field.source_attrs
+        if isinstance(field, (serializers.ListSerializer, ManyRelatedField)):
+            plan_many(plan, field, model, attrs, prefix)
+            continue
+        pk_only = (isinstance(field, RelatedField)
+                   and field.use_pk_only_optimization())
+        if pk_only:
+            plan_source(plan, model, attrs, prefix)
+            continue
+        if isinstance(field, (serializers.BaseSerializer, RelatedField)):
+            plan_related(plan, field, model, attrs, prefix)
+            continue
+        plan_source(plan, model, attrs, prefix)
+
+
+def plan_related(plan, field, model, attrs, prefix):
+    _, model_field = plan_source(plan, model, attrs, prefix)
+    if model_field is None or not (
+        model_field.many_to_one or model_field.one_to_one
+    ) or not model_field.concrete:
+        plan.disable_only()
+        return
+    path = prefix + '__'.join(attrs)
+    related_model = model_field.related_model
+    plan.select_related.add(path)
+    plan.add_only(path, f'{path}__{related_model._meta.pk.name}')
+    if isinstance(field, serializers.BaseSerializer):
+        walk_serializer(plan, field, related_model, path + '__')
+    elif getattr(field, 'slug_field', None) is not None:
+        plan.add_only(f'{path}__{field.slug_field}')
+    else:
+        plan.disable_only()
+
+
+def plan_many(plan, field, model, attrs, prefix):
+    if len(attrs) != 1:
+        plan.disable_only()
+        return
+    model_field = get_model_field(model, attrs[0])
+    if model_field is None or not model_field.is_relation:
+        plan.disable_only()
+        return
+    related_model = model_field.related_model
+    nested = LoadingPlan(related_model)
+    if model_field.one_to_many:
+        # Для reverse FK prefetch сопоставляет строки по внешнему ключу
+        nested.add_only(model_field.field.name)
+    child = getattr(field, 'child', None) or field.child_relation
+    if isinstance(child, serializers.BaseSerializer):
+        walk_serializer(nested, child, related_model)
+    elif isinstance(child, RelatedField):
+        slug_field = getattr(child, 'slug_field', None)
+        if slug_field is not None:
+            nested.add_only(slug_field)
+        elif not child.use_pk_only_optimization():
+            nested.disable_only()
+    plan.prefetches[prefix + attrs[0]] = nested
+
+
+def build_loading_plan(model, serializer):
+    plan = LoadingPlan(model)
+    walk_serializer(plan, serializer, model)
+    return plan
+
+
+class EagerLoadingMixin:
+    """Подбирает select_related/prefetch_related/only() по сериализатору.
+
+    План строится по полям сериализатора текущего действия и применяется
+    к queryset в list и retrieve. При DEBUG план отдается в заголовке
+    X-Eager-Loading-Plan.
+    """
+    eager_loading_actions = ('list', 'retrieve')
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.action not in self.eager_loading_actions:
+            return queryset
+        plan = build_loading_plan(queryset.model, self.get_serializer())
+        # queryset из related manager (title.reviews.all()) проставляет
+        # родителя каждой строке и читает для этого внешний ключ
+        plan.add_only(*(
+            field.name for field in queryset._known_related_objects))
+        # Поля keyset-пагинации читаются из строк для курсора
+        plan.add_only(*(
+            ordering.lstrip('-')
+            for ordering in getattr(self, 'keyset_ordering', None) or ()))
+        self.eager_loading_plan = plan
+        return plan.apply(queryset)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs)
+        plan = getattr(self, 'eager_loading_plan', None)
+        if settings.DEBUG and plan is not None:
+            response[EAGER_LOADING_HEADER] = str(plan)
+        return response
+
+
+def parse_field_names(value):
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+class SparseFieldsetsMixin:
+    """Ограничивает поля ответа параметрами ?fields= и ?omit=.
+
+    Лишние поля удаляются из сериализатора, поэтому EagerLoadingMixin
+    строит only() только по оставшимся и остальные колонки не читаются.
+    """
+    fields_query_param = 'fields'
+    omit_query_param = 'omit'
+    sparse_fields_actions = ('list', 'retrieve')
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        if self.action in self.sparse_fields_actions:
+            self.restrict_fields(
+                getattr(serializer, 'child', serializer).fields)
+        return serializer
+
+    def restrict_fields(self, fields):
+        params = self.request.query_params
+        requested = {}
+        for param in (self.fields_query_param, self.omit_query_param):
+            if param in params:
+                requested[param] = parse_field_names(params[param])
+                unknown = set(requested[param]) - fields.keys()
+                if unknown:
+                    raise ValidationError({param: [
+                        'Неизвестные поля: ' + ', '.join(sorted(unknown))]})
+        if self.fields_query_param in requested:
+            keep = set(requested[self.fields_query_param])
+            for name in list(fields):
+                if name not in keep:
+                    fields.pop(name)
+        for name in requested.get(self.omit_query_param, ()):
+            fields.pop(name, None)
+
+
+class NotModified(Exception):
+    def __init__(self, response):
+        super().__init__()
+        self.response = response
+
+
+class ConditionalGetMixin:
+    """Отвечает 304 на условные GET по версиям из reviews/versions.py.
+
+    ETag и Last-Modified вычисляются из версий get_version_keys() после
+    проверки прав, но до обращения к queryset, поэтому совпавший
+    If-None-Match/If-Modified-Since не выполняет запросов к данным.
+    """
+    conditional_actions = ('list', 'retrieve')
+    version_keys = ()
+
+    def get_version_keys(self):
+        return self.version_keys
+
+    def get_conditional_validators(self):
+        tokens, modified = zip(*versions.get_versions(
+            *self.get_version_keys()))
+        # HTML browsable API и JSON одного URL - разные представления
+        etag = quote_etag(md5(':'.join(
+            tokens + (self.request.accepted_renderer.format, ))
+            .encode()).hexdigest())
+        return etag, timegm(max(modified).utctimetuple())
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.conditional_validators = None
+        if (
+            request.method not in ('GET', 'HEAD')
+            or self.action not in self.conditional_actions
+        ):
+            return
+        etag, last_modified = self.conditional_validators = (
+            self.get_conditional_validators())
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified)
+        if response is not None:
+            raise NotModified(response)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModified):
+            return exc.response
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs)
+        validators = getattr(self, 'conditional_validators', None)
+        if validators is not None and response.status_code in (200, 304):
+            etag, last_modified = validators
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(last_modified)
+        return response
+
+
+class NestedResourceMixin:
+    """Родительский объект вложенного маршрута одним запросом.
+
+    parent_lookups - пары (поле parent_model, kwarg URL) от ближайшего
+    родителя вверх по цепочке, например для комментариев
+    (('pk', 'review_id'), ('title_id', 'title_id')): отзыв ищется сразу с
+    условием на произведение, поэтому вся цепочка проверяется одним
+    запросом, а несовпадение дает 404. Найденный объект запоминается на
+    запросе и переиспользуется в get_queryset, perform_create и контексте
+    сериализатора.
+    """
+    parent_model = None
+    parent_lookups = ()
+
+    def get_parent(self):
+        filters = {
+            field: self.kwargs[kwarg] for field, kwarg in self.parent_lookups
+        }
+        key = (self.parent_model, tuple(sorted(filters.items())))
+        parents = self.request.__dict__.setdefault('nested_parents', {})
+        if key not in parents:
+            parents[key] = get_object_or_404(self.parent_model, **filters)
+        return parents[key]
@@ -0,0 +1,177 @@
+import copy
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError
+from django.db import connections
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetField:
+    def __init__(self, model, ordering):
+        self.descending = ordering.startswith('-')
+        self.field = model._meta.get_field(ordering.lstrip('-'))
+        self.attname = self.field.attname
+
+    def reversed(self):
+        field = copy.copy(self)
+        field.descending = not self.descending
+        return field
+
+    def order_by(self, nulls_order_largest):
+        expression = F(self.attname)
+        # Курсор считает NULL наименьшим значением, как в SQLite и MySQL
+        if not self.field.null or not nulls_order_largest:
+            return expression.desc() if self.descending else expression.asc()
+        if self.descending:
+            return expression.desc(nulls_last=True)
+        return expression.asc(nulls_first=True)
+
+    def equal(self, value):
+        if value is None:
+            return Q(**{f'{self.attname}__isnull': True})
+        return Q(**{self.attname: value})
+
+    def after(self, value):
+        if self.descending:
+            if value is None:
+                return None
+            condition = Q(**{f'{self.attname}__lt': value})
+            if self.field.null:
+                condition |= Q(**{f'{self.attname}__isnull': True})
+            return condition
+        if value is None:
+            return Q(**{f'{self.attname}__isnull': False})
+        return Q(**{f'{self.attname}__gt': value})
+
+    def encode(self, instance):
+        value = getattr(instance, self.attname)
+        if value is None:
+            return None
+        return self.field.value_to_string(instance)
+
+    def decode(self, value):
+        if value is None:
+            return None
+        return self.field.to_python(value)
+
+
+class PageNumberOrKeysetPagination(PageNumberPagination):
+    """Постраничная пагинация с опциональным keyset-режимом.
+
+    Keyset-режим включается параметром ?pagination=cursor или наличием
+    ?cursor=. Страница выбирается условием по полям view.keyset_ordering
+    (последнее поле должно быть уникальным), без OFFSET и COUNT(*),
+    поэтому она стабильна при одновременных вставках. Размер страницы
+    ?page_size= (не больше max_page_size) задается только в keyset-режиме.
+    """
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    mode_query_param = 'pagination'
+    keyset_mode = 'cursor'
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def use_keyset(self, request, view):
+        return getattr(view, 'keyset_ordering', None) is not None and (
+            request.query_params.get(self.mode_query_param)
+            == self.keyset_mode
+            or self.cursor_query_param in request.query_params
+        )
+
+    def get_page_size(self, request):
+        # Постраничный режим остается с PAGE_SIZE из настроек
+        if not self.keyset:
+            return self.page_size
+        return super().get_page_size(request)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = self.use_keyset(request, view)
+        if not self.keyset:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.fields = [
+            KeysetField(queryset.model, ordering)
+            for ordering in view.keyset_ordering
+        ]
+        values, reverse = self.decode_cursor(request)
+        fields = self.fields
+        if reverse:
+            fields = [field.reversed() for field in fields]
+        nulls_order_largest = connections[
+            queryset.db].features.nulls_order_largest
+        queryset = queryset.order_by(*(
+            field.order_by(nulls_order_largest) for field in fields))
+        if values is not None:
+            queryset = queryset.filter(self.after_position(fields, values))
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, values is not None
+        self.page_rows = rows
+        return rows
+
+    def after_position(self, fields, values):
+        condition = Q(pk__in=[])
+        prefix = Q()
+        for field, value in zip(fields, values):
+            after = field.after(value)
+            if after is not None:
+                condition |= prefix & after
+            prefix &= field.equal(value)
+        return condition
+
+    def decode_cursor(self, request):
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None, False
+        try:
+            data = json.loads(urlsafe_b64decode(cursor.encode('ascii')))
+            values = data['v']
+            if len(values) != len(self.fields):
+                raise ValueError
+            values = [
+                field.decode(value)
+                for field, value in zip(self.fields, values)
+            ]
+            return values, bool(data.get('r'))
+        except (TypeError, ValueError, KeyError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, instance, reverse):
+        data = {'v': [field.encode(instance) for field in self.fields]}
+        if reverse:
+            data['r'] = 1
+        cursor = urlsafe_b64encode(
+            json.dumps(data, separators=(',', ':')).encode()).decode('ascii')
+        url = replace_query_param(
+            self.request.build_absolute_uri(),
+            self.mode_query_param, self.keyset_mode)
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+        next_link = previous_link = None
+        if self.page_rows:
+            if self.has_next:
+                next_link = self.encode_cursor(self.page_rows[-1], False)
+            if self.has_previous:
+                previous_link = self.encode_cursor(self.page_rows[0], True)
+        return Response(OrderedDict([
+            ('next', next_link),
+            ('previous', previous_link),
+            ('results', data),
+        ]))
@@ -23,7 +23,7 @@ class IsAuthorOrModeratorOrAdminOrSuperuser(permissions.BasePermission):
 
     def has_object_permission(self, request, view, obj):
         return (
-            request.user == obj.author
+            request.user.pk == obj.author_id
             or request.user.is_moderator
             or request.user.is_admin
         )
@@ -2,9 +2,15 @@ from datetime import datetime
 
 from django.contrib.auth import get_user_model
 from django.contrib.auth.validators import UnicodeUsernameValidator
+from django.db import IntegrityError, models, transaction
+from django.utils.encoding import smart_str
 from rest_framework import serializers
+from rest_framework.settings import api_settings
 
+from reviews import authors, lookups
+from reviews.bulk import save_titles
 from reviews.models import Category, Comment, Genre, Review, Title
+from .compiled import CompiledRepresentationMixin
 
 User = get_user_model()
 
@@ -42,42 +48,116 @@ class CurrentTitleDefault:
         return serializer_field.context['view'].kwargs['title_id']
 
 
-class CommentSerializer(serializers.ModelSerializer):
-    author = serializers.SlugRelatedField(
-        read_only=True, slug_field='username'
-    )
+class AuthorField(serializers.RelatedField):
+    """username автора из reviews.authors вместо загрузки User."""
+
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def use_pk_only_optimization(self):
+        return True
+
+    def to_representation(self, value):
+        return authors.cache.get(value.pk)
+
+
+class AuthorListSerializer(serializers.ListSerializer):
+    """Загружает авторов всей страницы в кэш одним запросом."""
+
+    def to_representation(self, data):
+        if isinstance(data, models.Manager):
+            data = data.all()
+        if 'author' in self.child.fields:
+            data = list(data)
+            authors.cache.prime(item.author_id for item in data)
+        return super().to_representation(data)
+
+
+class CommentSerializer(
+    CompiledRepresentationMixin, serializers.ModelSerializer
+):
+    author = AuthorField()
 
     class Meta:
         model = Comment
+        list_serializer_class = AuthorListSerializer
         fields = ('id', 'text', 'author', 'pub_date')
         read_only_fields = ('id', 'author', 'pub_date')
 
 
-class ReviewSerializer(serializers.ModelSerializer):
-    author = serializers.SlugRelatedField(
-        read_only=True, slug_field='username'
-    )
+class ReviewSerializer(
+    CompiledRepresentationMixin, serializers.ModelSerializer
+):
+    author = AuthorField()
 
     class Meta:
-        fields = ('id', 'text', 'author', 'score', 'pub_date', 'title')
+        fields = (
+            'id', 'text', 'author', 'score', 'pub_date', 'title',
+            'comments_count')
         model = Review
-        read_only_fields = ('id', 'author', 'pub_date', 'title')
-
-    def validate(self, data):
-        data = super().validate(data)
-        if self._kwargs['context']['action'] == 'create':
-            user = self._kwargs['context']['user']
-            title = self._kwargs['context']['title']
-            if Review.objects.filter(
-                author=user, title=title
+        list_serializer_class = AuthorListSerializer
+        read_only_fields = (
+            'id', 'author', 'pub_date', 'title', 'comments_count')
+
+    default_error_messages = {
+        'duplicate': ('На одно произведение пользователь'
+                      'может оставить только один отзыв'),
+    }
+
+    def create(self, validated_data):
+        # Единственность отзыва проверяет ограничение
+        # unique_author_review_title, а не отдельный запрос перед вставкой
+        try:
+            with transaction.atomic():
+                return super().create(validated_data)
+        except IntegrityError:
+            if not Review.objects.filter(
+                author=validated_data['author'], title=validated_data['title']
             ).exists():
-                raise serializers.ValidationError(
-                    'На одно произведение пользователь'
-                    'может оставить только один отзыв')
-        return data
-
-
-class CategorySerializer(serializers.ModelSerializer):
+                # Нарушено другое ограничение
+                raise
+            raise serializers.ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: [
+                    self.error_messages['duplicate']]
+            }, code='duplicate')
+
+    def update(self, instance, validated_data):
+        # comments_count меняют сигналы Comment через F(): полное
+        # сохранение записало бы значение, прочитанное до них
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        instance.save(update_fields=list(validated_data))
+        return instance
+
+    def insert(self, data):
+        with transaction.atomic():
+            self.instance = Review.objects.create(**data)
+        return True
+
+    def upsert(self, author, title):
+        """Создает отзыв author или заменяет текст и оценку существующего.
+
+        Возвращает True, если отзыв создан. Сначала выполняется вставка,
+        и только если она не прошла, существующий отзыв читается и
+        обновляется.
+        """
+        data = dict(self.validated_data, author=author, title=title)
+        try:
+            return self.insert(data)
+        except IntegrityError:
+            review = Review.objects.filter(author=author, title=title).first()
+        if review is None:
+            # Мешавший отзыв успели удалить: вторая вставка проходит,
+            # а ошибка другого ограничения выбрасывается дальше
+            return self.insert(data)
+        self.instance = self.update(review, data)
+        return False
+
+
+class CategorySerializer(
+    CompiledRepresentationMixin, serializers.ModelSerializer
+):
 
     class Meta:
         fields = ('name', 'slug', )
@@ -88,32 +168,100 @@ class CategorySerializer(serializers.ModelSerializer):
         }
 
 
-class GenreSerializer(serializers.ModelSerializer):
+class GenreSerializer(
+    CompiledRepresentationMixin, serializers.ModelSerializer
+):
     class Meta:
         fields = ('name', 'slug', )
         model = Genre
 
 
-class TitleReadSerializer(serializers.ModelSerializer):
-    category = CategorySerializer(read_only=True)
-    genre = GenreSerializer(read_only=True, many=True)
+class LookupRelatedField(serializers.PrimaryKeyRelatedField):
+    """Выводит Category/Genre из процессного снимка (reviews/lookups.py).
+
+    Читается только id (внешний ключ или id из prefetch), а объект
+    представляется сериализатором serializer_class без JOIN справочника.
+    """
+
+    def __init__(self, snapshot, serializer_class, **kwargs):
+        self.snapshot = snapshot
+        self.serializer = serializer_class()
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        return self.serializer.to_representation(
+            self.snapshot.get(value.pk))
+
+
+class LookupSlugRelatedField(serializers.SlugRelatedField):
+    """SlugRelatedField, который ищет объекты в процессном снимке.
+
+    Перед первым slug запроса снимок сверяется с версией в БД, чтобы
+    запись не приняла slug, измененный в другом процессе.
+    """
+
+    def __init__(self, snapshot, **kwargs):
+        self.snapshot = snapshot
+        kwargs.setdefault('slug_field', 'slug')
+        kwargs.setdefault('queryset', snapshot.model.objects.all())
+        super().__init__(**kwargs)
+
+    def use_pk_only_optimization(self):
+        return True
+
+    def to_internal_value(self, data):
+        if not isinstance(data, str):
+            self.fail('invalid')
+        request = self.context.get('request')
+        if request is not None:
+            checked = request.__dict__.setdefault('checked_snapshots', set())
+            if self.snapshot.model not in checked:
+                self.snapshot.refresh(force=True)
+                checked.add(self.snapshot.model)
+        obj = self.snapshot.get_by_slug(data)
+        if obj is None:
+            self.fail(
+                'does_not_exist',
+                slug_name=self.slug_field, value=smart_str(data))
+        return obj
+
+    def to_representation(self, value):
+        return getattr(self.snapshot.get(value.pk), self.slug_field)
+
+
+class TitleReadSerializer(
+    CompiledRepresentationMixin, serializers.ModelSerializer
+):
+    category = LookupRelatedField(
+        lookups.categories, CategorySerializer, read_only=True)
+    genre = LookupRelatedField(
+        lookups.genres, GenreSerializer, read_only=True, many=True)
 
     # С DecimalField не проходит тесты
     # rating = serializers.DecimalField(
     #     max_digits=4, decimal_places=2, read_only=True)
     rating = serializers.IntegerField(read_only=True)
+    # Каждый отзыв содержит оценку, поэтому это количество оценок
+    reviews_count = serializers.IntegerField(
+        source='rating_count', read_only=True)
 
     class Meta:
         fields = (
-            'id', 'name', 'year', 'rating', 'description', 'genre', 'category')
+            'id', 'name', 'year', 'rating', 'reviews_count', 'description',
+            'genre', 'category')
         model = Title
 
 
+class TopTitleSerializer(TitleReadSerializer):
+    weighted_rating = serializers.FloatField(read_only=True)
+
+    class Meta(TitleReadSerializer.Meta):
+        fields = TitleReadSerializer.Meta.fields + ('weighted_rating', )
+
+
 class TitleCreateUpdateSerializer(TitleReadSerializer):
-    genre = serializers.SlugRelatedField(
-        many=True, slug_field='slug', queryset=Genre.objects.all())
-    category = serializers.SlugRelatedField(
-        slug_field='slug', queryset=Category.objects.all())
+    genre = LookupSlugRelatedField(lookups.genres, many=True)
+    category = LookupSlugRelatedField(lookups.categories)
 
     def validate_year(self, value):
         if value > datetime.now().year:
@@ -122,6 +270,117 @@ class TitleCreateUpdateSerializer(TitleReadSerializer):
         return value
 
 
+class TitleBulkListSerializer(serializers.ListSerializer):
+    """Список произведений для /titles/bulk/.
+
+    Жанры и категории берутся из процессного снимка, поэтому проверка
+    всей пачки делает один запрос на существующие произведения и один
+    на занятые названия (только для элементов без ошибок в полях).
+    Ошибки возвращаются списком по элементам.
+    """
+    # Идентификаторы и названия пачки уходят одним списком IN (...),
+    # а SQLite принимает не больше 999 параметров в запросе
+    max_items = 500
+    default_error_messages = {
+        'max_items': 'Не больше {max_items} произведений за запрос.',
+        'not_found': 'Произведение не найдено.',
+        'duplicate_id': 'Произведение повторяется в запросе.',
+        'name_taken': 'Произведение с таким названием уже существует.',
+    }
+
+    def to_internal_value(self, data):
+        if not isinstance(data, list):
+            message = self.error_messages['not_a_list'].format(
+                input_type=type(data).__name__)
+            raise serializers.ValidationError(
+                {api_settings.NON_FIELD_ERRORS_KEY: [message]},
+                code='not_a_list')
+        if not data:
+            raise serializers.ValidationError(
+                {api_settings.NON_FIELD_ERRORS_KEY: [
+                    self.error_messages['empty']]},
+                code='empty')
+        if len(data) > self.max_items:
+            message = self.error_messages['max_items'].format(
+                max_items=self.max_items)
+            raise serializers.ValidationError(
+                {api_settings.NON_FIELD_ERRORS_KEY: [message]},
+                code='max_items')
+
+        items, errors = [], []
+        for item in data:
+            try:
+                items.append(self.child.run_validation(item))
+                errors.append({})
+            except serializers.ValidationError as exc:
+                items.append(None)
+                errors.append(dict(exc.detail))
+        self.validate_items(items, errors)
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return items
+
+    def validate_items(self, items, errors):
+        ids = [item['id'] for item in items if item and 'id' in item]
+        self.existing_titles = Title.objects.in_bulk(ids)
+        seen_ids = set()
+        for item, item_errors in zip(items, errors):
+            if item is None:
+                continue
+            pk = item.get('id')
+            if pk is not None:
+                if pk not in self.existing_titles:
+                    item_errors['id'] = [self.error_messages['not_found']]
+                elif pk in seen_ids:
+                    item_errors['id'] = [self.error_messages['duplicate_id']]
+                seen_ids.add(pk)
+        self.validate_names(items, errors)
+
+    def validate_names(self, items, errors):
+        taken = dict(Title.objects.filter(
+            name__in=[item['name'] for item in items if item]
+        ).values_list('name', 'id'))
+        seen_names = set()
+        for item, item_errors in zip(items, errors):
+            if item is None:
+                continue
+            pk = item.get('id')
+            name = item['name']
+            if name in seen_names or taken.get(name, pk) != pk:
+                item_errors['name'] = [self.error_messages['name_taken']]
+            seen_names.add(name)
+
+    def create(self, validated_data):
+        items = []
+        for data in validated_data:
+            data = dict(data)
+            genres = data.pop('genre')
+            pk = data.pop('id', None)
+            title = Title() if pk is None else self.existing_titles[pk]
+            for attr, value in data.items():
+                setattr(title, attr, value)
+            items.append((title, genres))
+        try:
+            return save_titles(items)
+        except IntegrityError:
+            # Название могли занять параллельным запросом после проверки
+            errors = [{} for _ in validated_data]
+            self.validate_names(validated_data, errors)
+            if not any(errors):
+                raise
+            raise serializers.ValidationError(errors)
+
+
+class TitleBulkSerializer(TitleCreateUpdateSerializer):
+    # Элемент с id обновляет произведение, без id - создает новое
+    id = serializers.IntegerField(required=False, min_value=1)
+
+    class Meta(TitleCreateUpdateSerializer.Meta):
+        list_serializer_class = TitleBulkListSerializer
+        # Уникальность названий проверяется для всей пачки сразу
+        extra_kwargs = {'name': {'validators': []}}
+
+
 class TokenObtainSerializer(serializers.Serializer):
     username = serializers.CharField(validators=[UnicodeUsernameValidator()], )
     confirmation_code = serializers.CharField(max_length=30)
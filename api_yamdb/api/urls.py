@@ -3,7 +3,7 @@ from rest_framework import routers
 
 from .views import (CategoryViewSet, CommentViewSet,
                     GenreViewSet, ReviewViewSet, TitleViewSet, TokenObtainView,
-                    UserViewSet, auth_signup)
+                    UserViewSet, auth_signup, autocomplete)
 
 router = routers.DefaultRouter()
 
@@ -20,5 +20,6 @@ router.register(
 urlpatterns = [
     path('', include(router.urls)),
     path('auth/token/', TokenObtainView.as_view(), name='token_obtain_pair'),
-    path('auth/signup/', auth_signup, name='auth_signup')
+    path('auth/signup/', auth_signup, name='auth_signup'),
+    path('autocomplete/', autocomplete, name='autocomplete'),
 ]
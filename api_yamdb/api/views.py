@@ -1,38 +1,58 @@
 from django.contrib.auth import get_user_model
 from django.contrib.auth.tokens import default_token_generator
-from django.core.mail import send_mail
-from django.db.models import Avg
-from django.db import IntegrityError
+from django.db import IntegrityError, transaction
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from drf_yasg.utils import swagger_auto_schema
 from rest_framework import filters, mixins, permissions, status, viewsets
-from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.decorators import (action, api_view,
+                                       authentication_classes,
+                                       permission_classes)
 from rest_framework.response import Response
 from rest_framework.serializers import ValidationError
 from rest_framework.views import APIView
-from rest_framework_simplejwt.tokens import RefreshToken
 
-from reviews.models import Category, Genre, Review, Title
+from reviews import versions
+from reviews.models import (MAX_SCORE, MIN_SCORE, Category, Genre, Review,
+                            ScoreCounter, Title)
+from users import outbox
+from .authentication import ClaimsAccessToken
+from .autocomplete import catalog_autocomplete
+from .export import CONTENT_TYPES, NDJSON, RENDERERS, iterate_in_chunks
 from .filters import TitleFilter
+from .mixins import (ConditionalGetMixin, EagerLoadingMixin,
+                     NestedResourceMixin, SparseFieldsetsMixin,
+                     build_loading_plan)
+from .pagination import PageNumberOrKeysetPagination
 from .permissions import (IsAuthorOrModeratorOrAdminOrSuperuser,
                           IsSuperuserOrAdmin, IsSuperuserOrAdminOrReadOnly)
 from .serializers import (AuthSignupSerializer, CategorySerializer,
                           CommentSerializer, GenreSerializer, ReviewSerializer,
-                          TitleCreateUpdateSerializer, TitleReadSerializer,
-                          TokenObtainSerializer, UserMeSerializer,
+                          TitleBulkSerializer, TitleCreateUpdateSerializer,
+                          TitleReadSerializer, TokenObtainSerializer,
+                          TopTitleSerializer, UserMeSerializer,
                           UserSerializer)
 
 User = get_user_model()
 
+AUTOCOMPLETE_LIMIT = 10
+EXPAND_REVIEWS = 'reviews'
+EXPAND_REVIEWS_LIMIT = 5
+MAX_EXPAND_REVIEWS = 20
 
-class UserViewSet(viewsets.ModelViewSet):
+
+class UserViewSet(
+    SparseFieldsetsMixin, EagerLoadingMixin, viewsets.ModelViewSet
+):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [
         permissions.IsAuthenticated, IsSuperuserOrAdmin]
     filter_backends = (filters.SearchFilter, )
     search_fields = ('username', )
+    pagination_class = PageNumberOrKeysetPagination
+    keyset_ordering = ('id', )
     lookup_field = 'username'
     lookup_url_kwarg = 'username'
 
@@ -45,11 +65,13 @@ class UserViewSet(viewsets.ModelViewSet):
         pagination_class=None
     )
     def me(self, request):
+        # request.user собран из claims токена, профиль читается из БД
+        user = get_object_or_404(User, pk=request.user.pk)
         if request.method == 'GET':
-            serializer = self.get_serializer(request.user)
+            serializer = self.get_serializer(user)
             return Response(data=serializer.data, status=status.HTTP_200_OK)
         serializer = self.get_serializer(
-            request.user, data=request.data, partial=True
+            user, data=request.data, partial=True
         )
         serializer.is_valid(raise_exception=True)
         serializer.save()
@@ -58,6 +80,7 @@ class UserViewSet(viewsets.ModelViewSet):
 
 
 class CategoryViewSet(
+    ConditionalGetMixin,
     mixins.ListModelMixin,
     mixins.CreateModelMixin,
     mixins.DestroyModelMixin,
@@ -65,6 +88,7 @@ class CategoryViewSet(
 ):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
+    version_keys = (versions.CATEGORIES, )
     permission_classes = (IsSuperuserOrAdminOrReadOnly, )
     filter_backends = (filters.SearchFilter, )
     search_fields = ('name', )
@@ -73,6 +97,7 @@ class CategoryViewSet(
 
 
 class GenreViewSet(
+    ConditionalGetMixin,
     mixins.ListModelMixin,
     mixins.CreateModelMixin,
     mixins.DestroyModelMixin,
@@ -80,6 +105,7 @@ class GenreViewSet(
 ):
     queryset = Genre.objects.all()
     serializer_class = GenreSerializer
+    version_keys = (versions.GENRES, )
     permission_classes = (IsSuperuserOrAdminOrReadOnly, )
     filter_backends = (filters.SearchFilter, )
     search_fields = ('name', )
@@ -87,24 +113,167 @@ class GenreViewSet(
     lookup_field = 'slug'
 
 
-class TitleViewSet(viewsets.ModelViewSet):
-    queryset = Title.objects.annotate(
-        rating=Avg('reviews__score')).order_by('category', 'name', 'year')
+class TitleViewSet(
+    ConditionalGetMixin, SparseFieldsetsMixin, EagerLoadingMixin,
+    viewsets.ModelViewSet
+):
+    # category_id, а не category: сортировка по FK добавляет JOIN и
+    # сортирует по reviews_category.id, не используя индекс
+    queryset = Title.objects.order_by('category_id', 'name', 'year')
     permission_classes = (IsSuperuserOrAdminOrReadOnly, )
     filter_backends = (DjangoFilterBackend, )
     filterset_class = TitleFilter
+    pagination_class = PageNumberOrKeysetPagination
+    keyset_ordering = ('category', 'name', 'year', 'id')
     lookup_url_kwarg = 'titles_id'
+    # Нечисловой id не должен доходить до фильтров по title_id
+    lookup_value_regex = r'\d+'
+    version_keys = (versions.TITLES, )
+    eager_loading_actions = ('list', 'retrieve', 'top', 'export')
+    sparse_fields_actions = ('list', 'retrieve', 'top', 'export')
 
     def get_serializer_class(self):
-        if self.action in ('list', 'retrieve'):
+        if self.action in ('list', 'retrieve', 'export'):
             return TitleReadSerializer
+        if self.action == 'top':
+            return TopTitleSerializer
+        if self.action == 'bulk':
+            return TitleBulkSerializer
         return TitleCreateUpdateSerializer
 
+    def get_expand_reviews_limit(self):
+        """Число отзывов для ?expand=reviews[:N] или None."""
+        expand = self.request.query_params.get('expand')
+        if self.action != 'retrieve' or not expand:
+            return None
+        name, _, limit = expand.partition(':')
+        if name != EXPAND_REVIEWS:
+            raise ValidationError(
+                {'expand': [f'Поддерживается только {EXPAND_REVIEWS}[:N]']})
+        if not limit:
+            return EXPAND_REVIEWS_LIMIT
+        if not limit.isdigit() or not 0 < int(limit) <= MAX_EXPAND_REVIEWS:
+            raise ValidationError({'expand': [
+                f'N должно быть от 1 до {MAX_EXPAND_REVIEWS}']})
+        return int(limit)
+
+    def get_version_keys(self):
+        if self.get_expand_reviews_limit() is None:
+            return super().get_version_keys()
+        return super().get_version_keys() + (
+            versions.title_reviews(self.kwargs['titles_id']), versions.USERS)
+
+    def retrieve(self, request, *args, **kwargs):
+        limit = self.get_expand_reviews_limit()
+        instance = self.get_object()
+        data = self.get_serializer(instance).data
+        if limit is not None:
+            data['reviews'] = self.get_latest_reviews(instance, limit)
+        return Response(data)
+
+    def get_latest_reviews(self, title, limit):
+        # Django 2.2 не умеет ограничивать prefetch_related окном по
+        # родителю, но для одного произведения хватает запроса с LIMIT
+        serializer = ReviewSerializer(
+            many=True, context=self.get_serializer_context())
+        plan = build_loading_plan(Review, serializer.child)
+        plan.add_only('title')
+        serializer.instance = plan.apply(
+            title.reviews.order_by('-pub_date', 'id'))[:limit]
+        return serializer.data
+
+    def paginate_queryset(self, queryset):
+        # ?ids= (не больше MAX_TITLE_IDS) отдает все запрошенные
+        # произведения одним списком
+        if self.action == 'list' and self.request.query_params.get('ids'):
+            return None
+        return super().paginate_queryset(queryset)
 
-class ReviewViewSet(viewsets.ModelViewSet):
+    @action(
+        methods=['GET'],
+        detail=False,
+        permission_classes=[permissions.IsAuthenticated, IsSuperuserOrAdmin],
+        pagination_class=None
+    )
+    def export(self, request):
+        # Параметр format зарезервирован DRF для выбора рендерера
+        export_format = request.query_params.get('export_format', NDJSON)
+        if export_format not in RENDERERS:
+            raise ValidationError({'export_format': [
+                'Допустимые форматы: ' + ', '.join(RENDERERS)]})
+        queryset = self.filter_queryset(self.get_queryset())
+        response = StreamingHttpResponse(
+            RENDERERS[export_format](
+                self.get_serializer(), iterate_in_chunks(queryset)),
+            content_type=CONTENT_TYPES[export_format]
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="titles.{export_format}"')
+        return response
+
+    @action(methods=['POST'], detail=False, filter_backends=())
+    def bulk(self, request):
+        serializer = self.get_serializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        titles = serializer.save()
+        saved = Title.objects.select_related('category').prefetch_related(
+            'genre').in_bulk([title.pk for title in titles])
+        serializer = self.get_serializer(
+            [saved[title.pk] for title in titles], many=True)
+        return Response(data=serializer.data, status=status.HTTP_200_OK)
+
+    @action(
+        methods=['GET'],
+        detail=False,
+        keyset_ordering=('-weighted_rating', 'id')
+    )
+    def top(self, request):
+        queryset = self.filter_queryset(self.get_queryset()).filter(
+            weighted_rating__isnull=False
+        ).order_by('-weighted_rating', 'id')
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(
+        methods=['GET'],
+        detail=True,
+        url_path='rating-distribution',
+        filter_backends=(),
+        pagination_class=None
+    )
+    def rating_distribution(self, request, titles_id=None):
+        counters = dict(ScoreCounter.objects.filter(
+            title_id=titles_id).values_list('score', 'count'))
+        if not counters and not Title.objects.filter(pk=titles_id).exists():
+            raise Http404
+        distribution = {
+            str(score): counters.get(score, 0)
+            for score in range(MIN_SCORE, MAX_SCORE + 1)
+        }
+        data = {
+            'count': sum(distribution.values()),
+            'distribution': distribution,
+        }
+        return Response(data=data, status=status.HTTP_200_OK)
+
+
+class ReviewViewSet(
+    ConditionalGetMixin, NestedResourceMixin, SparseFieldsetsMixin,
+    EagerLoadingMixin, viewsets.ModelViewSet
+):
     serializer_class = ReviewSerializer
+    parent_model = Title
+    parent_lookups = (('pk', 'title_id'), )
+    pagination_class = PageNumberOrKeysetPagination
+    keyset_ordering = ('-pub_date', 'id')
     lookup_url_kwarg = 'review_id'
 
+    def get_version_keys(self):
+        # USERS: в отзывах выводится имя автора
+        return (
+            versions.title_reviews(self.kwargs['title_id']), versions.USERS)
+
     def get_permissions(self):
         if self.action in ('update', 'partial_update', 'destroy'):
             permission_classes = (IsAuthorOrModeratorOrAdminOrSuperuser, )
@@ -113,26 +282,31 @@ class ReviewViewSet(viewsets.ModelViewSet):
         return [permission() for permission in permission_classes]
 
     def get_queryset(self):
-        title = get_object_or_404(Title, id=self.kwargs['title_id'])
-        return title.reviews.all()
+        return self.get_parent().reviews.all()
 
     def perform_create(self, serializer):
-        title = get_object_or_404(Title, id=self.kwargs['title_id'])
-        serializer.save(author=self.request.user, title=title)
+        serializer.save(author=self.request.user, title=self.get_parent())
 
-    def get_serializer_context(self):
-        context = super().get_serializer_context()
-        title = get_object_or_404(Title, id=self.kwargs['title_id'])
-        context.update({
-            'action': self.action,
-            'title': title,
-            'user': self.request.user
-        })
-        return context
+    @action(detail=False, methods=['put'])
+    def mine(self, request, title_id=None):
+        """Создает или заменяет отзыв текущего пользователя."""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        created = serializer.upsert(request.user, self.get_parent())
+        return Response(
+            serializer.data,
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
 
 
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(
+    NestedResourceMixin, SparseFieldsetsMixin, EagerLoadingMixin,
+    viewsets.ModelViewSet
+):
     serializer_class = CommentSerializer
+    parent_model = Review
+    parent_lookups = (('pk', 'review_id'), ('title_id', 'title_id'))
+    pagination_class = PageNumberOrKeysetPagination
+    keyset_ordering = ('-pub_date', 'id')
     lookup_url_kwarg = 'comment_id'
 
     def get_permissions(self):
@@ -143,14 +317,10 @@ class CommentViewSet(viewsets.ModelViewSet):
         return [permission() for permission in permission_classes]
 
     def get_queryset(self):
-        review = get_object_or_404(Review, id=self.kwargs['review_id'],
-                                   title_id=self.kwargs['title_id'])
-        return review.comments.all()
+        return self.get_parent().comments.all()
 
     def perform_create(self, serializer):
-        review = get_object_or_404(Review, id=self.kwargs['review_id'],
-                                   title_id=self.kwargs['title_id'])
-        serializer.save(author=self.request.user, review=review)
+        serializer.save(author=self.request.user, review=self.get_parent())
 
 
 class TokenObtainView(APIView):
@@ -169,8 +339,8 @@ class TokenObtainView(APIView):
         ):
             raise ValidationError(detail='Confirmation code is incorrect')
 
-        refresh = RefreshToken.for_user(user=user)
-        data = {'token': str(refresh.access_token)}
+        token = ClaimsAccessToken.for_user(user)
+        data = {'token': str(token)}
         return Response(status=status.HTTP_200_OK, data=data)
 
 
@@ -180,24 +350,32 @@ def auth_signup(request):
     serializer = AuthSignupSerializer(data=request.data)
     serializer.is_valid(raise_exception=True)
     try:
-        user = User.objects.get_or_create(
-            username=serializer.validated_data['username'],
-            email=serializer.validated_data['email'],
-        )[0]
+        # Письмо с кодом отправляет команда send_outbox, запрос только
+        # записывает его в outbox вместе с пользователем
+        with transaction.atomic():
+            user = User.objects.get_or_create(
+                username=serializer.validated_data['username'],
+                email=serializer.validated_data['email'],
+            )[0]
+            outbox.enqueue(
+                'Yamdb. Код подтверждения.',
+                'Вы зарегистрировались на ресурсе Yamdb.\n'
+                f'username = {serializer.validated_data["username"]}\n'
+                f'confirmation_code = {outbox.CONFIRMATION_CODE}',
+                'yamdb@example.com',
+                serializer.validated_data['email'],
+                user=user,
+            )
     except IntegrityError as e:
         return Response(data=repr(e), status=status.HTTP_400_BAD_REQUEST)
 
-    confirmation_code = default_token_generator.make_token(user)
+    return Response(data=serializer.data, status=status.HTTP_200_OK)
 
-    send_mail(
-        'Yamdb. Код подтверждения.',
-        'Вы зарегистрировались на ресурсе Yamdb.\n'
-        f'username = {serializer.validated_data["username"]}\n'
-        f'confirmation_code = {confirmation_code}',
-        'yamdb@example.com',
-        [serializer.validated_data['email']],
-        fail_silently=False,
-    )
 
-    user.save()
-    return Response(data=serializer.data, status=status.HTTP_200_OK)
+@api_view(http_method_names=['GET', ],)
+@authentication_classes([])
+@permission_classes([])
+def autocomplete(request):
+    suggestions = catalog_autocomplete.suggest(
+        request.query_params.get('q', ''), AUTOCOMPLETE_LIMIT)
+    return Response(data=suggestions, status=status.HTTP_200_OK)
@@ -0,0 +1,72 @@
+from django.db import IntegrityError, transaction
+from django.db.models import (Avg, Case, Count, ExpressionWrapper, F,
+                              FloatField, Sum, Value, When)
+from django.db.models.functions import Cast
+
+from .models import Review, ScoreCounter, Title
+
+
+def change_title_rating(title_id, score_delta, count_delta):
+    Title.objects.filter(pk=title_id).update(
+        rating_sum=F('rating_sum') + score_delta,
+        rating_count=F('rating_count') + count_delta,
+    )
+
+
+def change_score_counter(title_id, score, delta):
+    counters = ScoreCounter.objects.filter(title_id=title_id, score=score)
+    if counters.update(count=F('count') + delta) or delta < 0:
+        return
+    try:
+        with transaction.atomic():
+            ScoreCounter.objects.create(
+                title_id=title_id, score=score, count=delta)
+    except IntegrityError:
+        # Счетчик успел создать параллельный запрос
+        counters.update(count=F('count') + delta)
+
+
+def add_review_score(title_id, score, sign=1):
+    change_title_rating(title_id, sign * score, sign)
+    change_score_counter(title_id, score, sign)
+
+
+def change_comments_count(review_id, delta):
+    Review.objects.filter(pk=review_id).update(
+        comments_count=F('comments_count') + delta)
+
+
+def refresh_title_rating(title_id):
+    reviews = Review.objects.filter(title_id=title_id)
+    aggregates = reviews.aggregate(total=Sum('score'), count=Count('id'))
+    Title.objects.filter(pk=title_id).update(
+        rating_sum=aggregates['total'] or 0,
+        rating_count=aggregates['count'],
+    )
+    ScoreCounter.objects.filter(title_id=title_id).delete()
+    ScoreCounter.objects.bulk_create(
+        ScoreCounter(title_id=title_id, score=row['score'], count=row['count'])
+        for row in reviews.values('score').annotate(
+            count=Count('id')).order_by()
+    )
+
+
+def update_weighted_ratings(min_votes):
+    """Пересчитывает Title.weighted_rating одним UPDATE по всем произведениям.
+
+    WR = (v * R + m * C) / (v + m), где v и R - количество и средняя оценка
+    произведения, C - средняя оценка по всем отзывам, m - min_votes.
+    """
+    mean_score = Review.objects.aggregate(mean=Avg('score'))['mean']
+    if mean_score is None:
+        return Title.objects.update(weighted_rating=None)
+    weighted = ExpressionWrapper(
+        (Cast('rating_sum', FloatField()) + Value(min_votes * mean_score))
+        / (F('rating_count') + Value(min_votes)),
+        output_field=FloatField()
+    )
+    return Title.objects.update(weighted_rating=Case(
+        When(rating_count=0, then=None),
+        default=weighted,
+        output_field=FloatField()
+    ))
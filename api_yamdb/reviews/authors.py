@@ -0,0 +1,85 @@
+import threading
+import time
+from collections import OrderedDict
+
+from . import versions
+from .lookups import VERSION_CHECK_INTERVAL
+from .models import User
+
+# Сколько авторов держать в памяти процесса
+MAX_AUTHORS = 10000
+
+
+class AuthorCache:
+    """Процессный LRU-кэш id пользователя -> username для отзывов и
+    комментариев.
+
+    Страница заполняется одним запросом с IN по авторам, которых нет в
+    кэше. Смена username меняет версию USERS в reviews/versions.py: кэш
+    своего процесса сбрасывается после коммита, остальные процессы
+    сверяют версию в БД не чаще раза в VERSION_CHECK_INTERVAL секунд.
+    Словарь читается и меняется только под lock: его используют все
+    потоки процесса.
+    """
+
+    def __init__(self, max_size=MAX_AUTHORS):
+        self.max_size = max_size
+        self.lock = threading.Lock()
+        self.version = None
+        self.checked_at = None
+        self.usernames = OrderedDict()
+
+    def invalidate(self):
+        self.checked_at = None
+        self.version = None
+
+    def refresh(self):
+        now = time.monotonic()
+        if (
+            self.checked_at is not None
+            and now - self.checked_at < VERSION_CHECK_INTERVAL
+        ):
+            return
+        version, _ = versions.get_version(versions.USERS)
+        if version != self.version:
+            with self.lock:
+                self.usernames.clear()
+                self.version = version
+        self.checked_at = now
+
+    def prime(self, user_ids):
+        """Загружает в кэш отсутствующих авторов одним запросом."""
+        self.refresh()
+        user_ids = set(user_ids)
+        with self.lock:
+            missing = user_ids - self.usernames.keys()
+        missing.discard(None)
+        if not missing:
+            return
+        self.store(User.objects.filter(
+            pk__in=missing).values_list('pk', 'username'))
+
+    def store(self, items):
+        # Давно не использованные записи вытесняются
+        with self.lock:
+            for user_id, username in items:
+                self.usernames[user_id] = username
+                self.usernames.move_to_end(user_id)
+            while len(self.usernames) > self.max_size:
+                self.usernames.popitem(last=False)
+
+    def get(self, user_id):
+        """username пользователя; None, если его нет."""
+        self.refresh()
+        with self.lock:
+            username = self.usernames.get(user_id)
+            if username is not None:
+                self.usernames.move_to_end(user_id)
+                return username
+        self.prime([user_id])
+        with self.lock:
+            return self.usernames.get(user_id)
+
+
+cache = AuthorCache()
+versions.subscribe(versions.USERS, cache.invalidate)
@@ -0,0 +1,48 @@
+from django.db import transaction
+
+from . import search, trigrams, versions
+from .models import Title
+
+TITLE_UPDATE_FIELDS = ('name', 'year', 'description', 'category')
+
+
+@transaction.atomic
+def save_titles(items):
+    """Сохраняет пачку произведений: список пар (title, жанры).
+
+    Новые произведения (pk is None) создаются bulk_create, остальные
+    обновляются bulk_update, жанры заменяются одним DELETE и одним
+    INSERT в промежуточную таблицу. Сигналы при этом не отправляются,
+    поэтому индексы поиска и версия titles обновляются здесь.
+    """
+    created = [title for title, _ in items if title.pk is None]
+    updated = [title for title, _ in items if title.pk is not None]
+    renamed = [
+        title for title in updated if title._saved_name != title.name]
+    Title.objects.bulk_create(created)
+    if created and created[0].pk is None:
+        # SQLite и MySQL не возвращают первичные ключи из bulk_create
+        ids = dict(Title.objects.filter(
+            name__in=[title.name for title in created]
+        ).values_list('name', 'id'))
+        for title in created:
+            title.pk = ids[title.name]
+    Title.objects.bulk_update(updated, TITLE_UPDATE_FIELDS)
+
+    through = Title.genre.through
+    through.objects.filter(title__in=updated).delete()
+    through.objects.bulk_create([
+        through(title_id=title.pk, genre_id=genre.pk)
+        for title, genres in items
+        for genre in {genre.pk: genre for genre in genres}.values()
+    ])
+
+    search.index_titles([title.pk for title, _ in items])
+    trigrams.index_titles(created + renamed)
+    for title in created + renamed:
+        title._saved_name = title.name
+    if created or renamed:
+        versions.bump(versions.TITLES, versions.NAMES)
+    else:
+        versions.bump(versions.TITLES)
+    return [title for title, _ in items]
@@ -0,0 +1,94 @@
+import threading
+import time
+
+from . import versions
+from .models import Category, Genre
+
+# Как часто сверять снимок с общей версией: изменения из других процессов
+# видны с такой задержкой, изменения своего процесса - сразу после коммита
+VERSION_CHECK_INTERVAL = 1.0
+
+
+class LookupSnapshot:
+    """Процессный снимок небольшой справочной таблицы (Category, Genre).
+
+    Таблица читается целиком при первом обращении и перечитывается, когда
+    меняется ее версия в reviews/versions.py. Смена версии сбрасывает
+    снимок своего процесса после коммита, остальные процессы сходятся
+    по версии из БД. Объекты снимка общие для всех потоков, изменять их
+    нельзя.
+    """
+
+    def __init__(self, model, version_key):
+        self.model = model
+        self.version_key = version_key
+        self.lock = threading.Lock()
+        self.version = None
+        self.checked_at = None
+        self.by_id = {}
+        self.by_slug = {}
+
+    def __deepcopy__(self, memo):
+        # DRF копирует аргументы полей сериализатора, а снимок один
+        # на процесс
+        return self
+
+    def invalidate(self):
+        self.checked_at = None
+        self.version = None
+
+    def refresh(self, force=False):
+        """Сверяет версию, если с прошлой сверки прошло больше
+        VERSION_CHECK_INTERVAL секунд (или всегда при force)."""
+        now = time.monotonic()
+        if (
+            not force
+            and self.checked_at is not None
+            and now - self.checked_at < VERSION_CHECK_INTERVAL
+        ):
+            return
+        version, _ = versions.get_version(self.version_key)
+        if version != self.version:
+            with self.lock:
+                if version != self.version:
+                    objects = list(self.model.objects.all())
+                    self.by_id = {obj.pk: obj for obj in objects}
+                    self.by_slug = {obj.slug: obj for obj in objects}
+                    self.version = version
+        self.checked_at = now
+
+    def get(self, pk):
+        """Объект по id; None, если его нет."""
+        self.refresh()
+        obj = self.by_id.get(pk)
+        if obj is None:
+            # Объект может быть создан в текущей, еще не закоммиченной
+            # транзакции: читаем его из БД, не добавляя в снимок
+            obj = self.model.objects.filter(pk=pk).first()
+        return obj
+
+    def get_by_slug(self, slug):
+        self.refresh()
+        obj = self.by_slug.get(slug)
+        if obj is None:
+            obj = self.model.objects.filter(slug=slug).first()
+        return obj
+
+    def ids_by_slug(self, slugs):
+        """{slug: id} для существующих объектов с указанными slug."""
+        self.refresh()
+        ids = {
+            slug: self.by_slug[slug].pk
+            for slug in slugs if slug in self.by_slug
+        }
+        missing = set(slugs) - ids.keys()
+        if missing:
+            ids.update(self.model.objects.filter(
+                slug__in=missing).values_list('slug', 'id'))
+        return ids
+
+
+categories = LookupSnapshot(Category, versions.CATEGORIES)
+genres = LookupSnapshot(Genre, versions.GENRES)
+versions.subscribe(versions.CATEGORIES, categories.invalidate)
+versions.subscribe(versions.GENRES, genres.invalidate)
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from reviews.aggregates import update_weighted_ratings
+
+
+class Command(BaseCommand):
+    help = """Recalculates the Bayesian weighted rating of all titles
+    (used by /api/v1/titles/top/) in a single set-based UPDATE."""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--min-votes', type=int, default=10,
+            help='Number of reviews a title needs to be trusted '
+                 'as much as the mean score')
+
+    def handle(self, *args, **options):
+        updated = update_weighted_ratings(options['min_votes'])
+        self.stdout.write(f'Weighted rating updated: {updated} title(s)')
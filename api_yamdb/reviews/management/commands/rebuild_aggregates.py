@@ -0,0 +1,118 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, Sum
+
+from reviews import versions
+from reviews.models import Comment, Review, ScoreCounter, Title
+
+
+class Command(BaseCommand):
+    help = """Recalculates denormalized aggregates: title rating_sum,
+    rating_count (also served as reviews_count) and score counters from
+    the Review table, review comments_count from the Comment table.
+    With --check only reports mismatches and exits with an error."""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Only verify aggregates, do not change the database')
+
+    def handle(self, *args, **options):
+        check = options['check']
+        with transaction.atomic():
+            mismatched = self.rebuild_title_ratings(check=check)
+            mismatched += self.rebuild_score_counters(check=check)
+            if mismatched and not check:
+                versions.bump(versions.TITLES)
+            mismatched += self.rebuild_comment_counts(check=check)
+        if not check:
+            self.stdout.write(f'Fixed aggregates: {mismatched} object(s)')
+        elif mismatched:
+            raise CommandError(
+                f'Mismatched aggregates: {mismatched} object(s)')
+        else:
+            self.stdout.write('All aggregates are consistent')
+
+    def rebuild_title_ratings(self, check):
+        actual = {
+            row['title_id']: (row['total'], row['count'])
+            for row in Review.objects.values('title_id').annotate(
+                total=Sum('score'), count=Count('id')).order_by()
+        }
+        changed = []
+        for title in Title.objects.only(
+            'id', 'rating_sum', 'rating_count'
+        ).iterator():
+            total, count = actual.get(title.id, (0, 0))
+            if (title.rating_sum, title.rating_count) == (total, count):
+                continue
+            self.stdout.write(
+                f'Title id = {title.id}: stored '
+                f'{title.rating_sum}/{title.rating_count}, '
+                f'actual {total}/{count}')
+            title.rating_sum, title.rating_count = total, count
+            changed.append(title)
+        if not check:
+            Title.objects.bulk_update(
+                changed, ['rating_sum', 'rating_count'], batch_size=500)
+        return len(changed)
+
+    def rebuild_score_counters(self, check):
+        actual = {
+            (row['title_id'], row['score']): row['count']
+            for row in Review.objects.values('title_id', 'score').annotate(
+                count=Count('id')).order_by()
+        }
+        stored = {
+            (counter.title_id, counter.score): counter
+            for counter in ScoreCounter.objects.all()
+        }
+        changed, created, removed = [], [], []
+        for key in actual.keys() | stored.keys():
+            count = actual.get(key, 0)
+            counter = stored.get(key)
+            if (counter.count if counter else 0) == count:
+                continue
+            self.stdout.write(
+                f'Title id = {key[0]}, score = {key[1]}: stored '
+                f'{counter.count if counter else 0}, actual {count}')
+            if counter is None:
+                created.append(ScoreCounter(
+                    title_id=key[0], score=key[1], count=count))
+            elif count == 0:
+                removed.append(counter.id)
+            else:
+                counter.count = count
+                changed.append(counter)
+        if not check:
+            ScoreCounter.objects.filter(id__in=removed).delete()
+            ScoreCounter.objects.bulk_update(
+                changed, ['count'], batch_size=500)
+            ScoreCounter.objects.bulk_create(created, batch_size=500)
+        return len(changed) + len(created) + len(removed)
+
+    def rebuild_comment_counts(self, check):
+        actual = dict(
+            Comment.objects.values('review_id').annotate(
+                count=Count('id')).order_by().values_list(
+                    'review_id', 'count'))
+        changed = []
+        for review in Review.objects.only(
+            'id', 'title_id', 'comments_count'
+        ).iterator():
+            count = actual.get(review.id, 0)
+            if review.comments_count == count:
+                continue
+            self.stdout.write(
+                f'Review id = {review.id}: stored '
+                f'{review.comments_count} comments, actual {count}')
+            review.comments_count = count
+            changed.append(review)
+        if changed and not check:
+            Review.objects.bulk_update(
+                changed, ['comments_count'], batch_size=500)
+            versions.bump(*{
+                versions.title_reviews(review.title_id)
+                for review in changed
+            })
+        return len(changed)
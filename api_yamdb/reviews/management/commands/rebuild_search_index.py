@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from reviews import search, trigrams
+
+
+class Command(BaseCommand):
+    help = """Rebuilds the search indexes of titles from scratch:
+    the full-text index (name, description, category and genre names)
+    and the trigram index of names used by fuzzy search."""
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            trigrams.rebuild_index()
+            if search.is_supported():
+                search.rebuild_index()
+            else:
+                self.stderr.write(
+                    'Full-text index is available only on SQLite')
+        self.stdout.write('Search indexes rebuilt')
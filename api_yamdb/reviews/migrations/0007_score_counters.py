@@ -0,0 +1,40 @@
+# Generated by Django 2.2.16 on 2026-10-18 19:02
+
+from django.db import migrations, models
+from django.db.models import Count
+import django.db.models.deletion
+
+
+def fill_score_counters(apps, schema_editor):
+    Review = apps.get_model('reviews', 'Review')
+    ScoreCounter = apps.get_model('reviews', 'ScoreCounter')
+    ScoreCounter.objects.bulk_create(
+        ScoreCounter(
+            title_id=row['title_id'], score=row['score'], count=row['count'])
+        for row in Review.objects.values('title_id', 'score').annotate(
+            count=Count('id')).order_by()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0006_title_rating_aggregates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScoreCounter',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.PositiveSmallIntegerField(verbose_name='Оценка')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='Количество оценок')),
+                ('title', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='score_counters', to='reviews.Title')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='scorecounter',
+            constraint=models.UniqueConstraint(fields=('title', 'score'), name='unique_title_score_counter'),
+        ),
+        migrations.RunPython(fill_score_counters, migrations.RunPython.noop),
+    ]
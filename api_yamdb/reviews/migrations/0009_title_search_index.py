@@ -0,0 +1,43 @@
+# Generated by Django 2.2.16 on 2026-10-18 19:10
+
+from django.db import migrations
+
+CREATE_INDEX = (
+    'CREATE VIRTUAL TABLE IF NOT EXISTS reviews_title_fts USING fts5('
+    'name, description, category, genres, '
+    "tokenize='unicode61 remove_diacritics 2')"
+)
+FILL_INDEX = (
+    'INSERT INTO reviews_title_fts (rowid, name, description, category, genres) '
+    "SELECT t.id, t.name, t.description, COALESCE(c.name, ''), "
+    "COALESCE((SELECT group_concat(g.name, ' ') FROM reviews_genre g "
+    'INNER JOIN reviews_title_genre tg ON tg.genre_id = g.id '
+    "WHERE tg.title_id = t.id), '') "
+    'FROM reviews_title t '
+    'LEFT OUTER JOIN reviews_category c ON c.id = t.category_id'
+)
+
+
+def create_search_index(apps, schema_editor):
+    # Полнотекстовый индекс FTS5 есть только в SQLite
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(CREATE_INDEX)
+    schema_editor.execute(FILL_INDEX)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute('DROP TABLE IF EXISTS reviews_title_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0008_title_weighted_rating'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
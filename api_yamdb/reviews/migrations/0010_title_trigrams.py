@@ -0,0 +1,45 @@
+# Generated by Django 2.2.16 on 2026-10-18 19:09
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def title_trigrams(name):
+    padded = '  ' + ' '.join(name.lower().replace('ё', 'е').split()) + '  '
+    return {padded[index:index + 3] for index in range(len(padded) - 2)}
+
+
+def fill_title_trigrams(apps, schema_editor):
+    Title = apps.get_model('reviews', 'Title')
+    TitleTrigram = apps.get_model('reviews', 'TitleTrigram')
+    TitleTrigram.objects.bulk_create(
+        [
+            TitleTrigram(title_id=title_id, trigram=trigram)
+            for title_id, name in Title.objects.values_list('id', 'name')
+            for trigram in title_trigrams(name)
+        ],
+        batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0009_title_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TitleTrigram',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('trigram', models.CharField(max_length=3, verbose_name='Триграмма')),
+                ('title', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trigrams', to='reviews.Title')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='titletrigram',
+            index=models.Index(fields=['trigram', 'title'], name='title_trigram_idx'),
+        ),
+        migrations.RunPython(fill_title_trigrams, migrations.RunPython.noop),
+    ]
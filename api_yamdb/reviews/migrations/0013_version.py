@@ -0,0 +1,21 @@
+# Generated by Django 2.2.16 on 2026-10-18 19:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0012_review_comments_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Version',
+            fields=[
+                ('key', models.CharField(max_length=100, primary_key=True, serialize=False, verbose_name='Ключ')),
+                ('token', models.CharField(max_length=32, verbose_name='Токен')),
+                ('modified', models.DateTimeField(verbose_name='Время изменения')),
+            ],
+        ),
+    ]
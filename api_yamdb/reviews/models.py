@@ -1,9 +1,12 @@
 from django.contrib.auth import get_user_model
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import models, transaction
 
 User = get_user_model()
 
+MIN_SCORE = 1
+MAX_SCORE = 10
+
 
 class Category(models.Model):
     name = models.CharField('Имя категории', max_length=256)
@@ -40,12 +43,69 @@ class Title(models.Model):
         Category, on_delete=models.SET_NULL, related_name='titles',
         help_text='Выберете категорию', null=True
     )
+    # Сумма и количество оценок поддерживаются сигналами Review
+    # (см. reviews/signals.py), чтобы не считать Avg при каждом запросе
+    rating_sum = models.PositiveIntegerField(
+        'Сумма оценок', default=0, editable=False
+    )
+    rating_count = models.PositiveIntegerField(
+        'Количество оценок', default=0, editable=False
+    )
+    # Байесовский рейтинг, пересчитывается командой
+    # compute_weighted_ratings, для /titles/top/
+    weighted_rating = models.FloatField(
+        'Взвешенный рейтинг', null=True, editable=False
+    )
+
+    # Колонки, из которых вычисляются свойства (для only() в api/mixins.py)
+    property_dependencies = {'rating': ('rating_sum', 'rating_count')}
 
     def __str__(self):
         return self.name
 
+    @property
+    def rating(self):
+        if not self.rating_count:
+            return None
+        return self.rating_sum / self.rating_count
+
     class Meta:
         ordering = ['category', 'name', 'year']
+        indexes = [
+            # Под сортировку списка и фильтры TitleFilter, см.
+            # tests/test_16_title_query_plans.py
+            models.Index(
+                fields=['category', 'name', 'year'],
+                name='title_category_name_year_idx'
+            ),
+            models.Index(
+                fields=['year', 'category', 'name'],
+                name='title_year_category_name_idx'
+            ),
+            models.Index(
+                fields=['-weighted_rating', 'id'],
+                name='title_weighted_rating_idx'
+            ),
+            models.Index(
+                fields=['category', '-weighted_rating', 'id'],
+                name='title_category_weighted_idx'
+            ),
+        ]
+
+
+class TitleTrigram(models.Model):
+    # Триграммы названия для нечеткого поиска, см. reviews/trigrams.py
+    title = models.ForeignKey(
+        Title, on_delete=models.CASCADE, related_name='trigrams'
+    )
+    trigram = models.CharField('Триграмма', max_length=3)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['trigram', 'title'], name='title_trigram_idx'
+            ),
+        ]
 
 
 class Review(models.Model):
@@ -53,13 +113,23 @@ class Review(models.Model):
         User, on_delete=models.CASCADE, related_name='reviews'
     )
     score = models.IntegerField(
-        default=5, validators=[MinValueValidator(1), MaxValueValidator(10)]
+        default=5, validators=[
+            MinValueValidator(MIN_SCORE), MaxValueValidator(MAX_SCORE)]
     )
     pub_date = models.DateTimeField('Дата публикации', auto_now_add=True)
     text = models.TextField()
     title = models.ForeignKey(
         Title, on_delete=models.CASCADE, related_name='reviews'
     )
+    # Поддерживается сигналами Comment (см. reviews/signals.py)
+    comments_count = models.PositiveIntegerField(
+        'Количество комментариев', default=0, editable=False
+    )
+
+    def save(self, *args, **kwargs):
+        # post_save обновляет рейтинг произведения в этой же транзакции
+        with transaction.atomic():
+            super().save(*args, **kwargs)
 
     class Meta:
         ordering = ['-pub_date']
@@ -71,6 +141,34 @@ class Review(models.Model):
         ]
 
 
+class ScoreCounter(models.Model):
+    # Количество оценок каждого значения, поддерживается сигналами Review
+    title = models.ForeignKey(
+        Title, on_delete=models.CASCADE, related_name='score_counters'
+    )
+    score = models.PositiveSmallIntegerField('Оценка')
+    count = models.PositiveIntegerField('Количество оценок', default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['title', 'score'],
+                name='unique_title_score_counter'
+            )
+        ]
+
+
+def cascade_review_comments(collector, field, sub_objs, using):
+    """CASCADE, который отмечает комментарии удаляемого отзыва.
+
+    Отметка хранится в самих собранных объектах: post_delete комментария
+    не обновляет счетчик и версии, это сделает post_delete отзыва.
+    """
+    for comment in sub_objs:
+        comment._review_deleted = True
+    models.CASCADE(collector, field, sub_objs, using)
+
+
 class Comment(models.Model):
     author = models.ForeignKey(
         User, on_delete=models.CASCADE, related_name='comments'
@@ -78,8 +176,21 @@ class Comment(models.Model):
     pub_date = models.DateTimeField('Дата публикации', auto_now_add=True)
     text = models.TextField()
     review = models.ForeignKey(
-        Review, on_delete=models.CASCADE, related_name='comments'
+        Review, on_delete=cascade_review_comments, related_name='comments'
     )
 
+    def save(self, *args, **kwargs):
+        # post_save обновляет comments_count отзыва в этой же транзакции
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
     class Meta:
         ordering = ['-pub_date']
+
+
+class Version(models.Model):
+    # Версии данных для кэшей и ETag, см. reviews/versions.py. Хранятся
+    # в БД, чтобы все воркеры видели одну и ту же версию
+    key = models.CharField('Ключ', max_length=100, primary_key=True)
+    token = models.CharField('Токен', max_length=32)
+    modified = models.DateTimeField('Время изменения')
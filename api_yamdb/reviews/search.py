@@ -0,0 +1,119 @@
+import re
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .models import Category, Genre, Title
+
+FTS_TABLE = 'reviews_title_fts'
+# Веса колонок для bm25: name, description, category, genres
+FTS_WEIGHTS = (10.0, 1.0, 2.0, 2.0)
+# Окончания, которые отбрасываются перед префиксным поиском, чтобы
+# «драмы» и «драма» находили друг друга (упрощенный стемминг)
+RUSSIAN_ENDINGS = (
+    'ами', 'ями', 'ого', 'его', 'ому', 'ему', 'ыми', 'ими',
+    'ой', 'ей', 'ий', 'ый', 'ая', 'яя', 'ое', 'ее', 'ые', 'ие',
+    'ам', 'ям', 'ах', 'ях', 'ом', 'ем', 'ов', 'ев',
+    'а', 'я', 'о', 'е', 'ы', 'и', 'у', 'ю', 'ь',
+)
+MIN_STEM_LENGTH = 3
+TOKEN_RE = re.compile(r'\w+')
+
+
+def is_supported():
+    return connection.vendor == 'sqlite'
+
+
+def index_titles_sql(where):
+    title_table = Title._meta.db_table
+    through_table = Title.genre.through._meta.db_table
+    return (
+        f'INSERT INTO {FTS_TABLE} '
+        '(rowid, name, description, category, genres) '
+        "SELECT t.id, t.name, t.description, COALESCE(c.name, ''), "
+        "COALESCE((SELECT group_concat(g.name, ' ') "
+        f'FROM {Genre._meta.db_table} g '
+        f'INNER JOIN {through_table} tg ON tg.genre_id = g.id '
+        "WHERE tg.title_id = t.id), '') "
+        f'FROM {title_table} t '
+        f'LEFT OUTER JOIN {Category._meta.db_table} c '
+        f'ON c.id = t.category_id {where}'
+    )
+
+
+def index_titles(title_ids):
+    title_ids = list(title_ids)
+    if not title_ids or not is_supported():
+        return
+    placeholders = ', '.join(['%s'] * len(title_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})',
+            title_ids)
+        cursor.execute(
+            index_titles_sql(f'WHERE t.id IN ({placeholders})'), title_ids)
+
+
+def remove_titles(title_ids):
+    title_ids = list(title_ids)
+    if not title_ids or not is_supported():
+        return
+    placeholders = ', '.join(['%s'] * len(title_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})',
+            title_ids)
+
+
+def rebuild_index():
+    if not is_supported():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        cursor.execute(index_titles_sql(''))
+
+
+def stem(token):
+    for ending in RUSSIAN_ENDINGS:
+        if (
+            token.endswith(ending)
+            and len(token) - len(ending) >= MIN_STEM_LENGTH
+        ):
+            return token[:-len(ending)]
+    return token
+
+
+def build_match_query(text):
+    # Каждое слово - префиксный запрос в кавычках, поэтому спецсимволы
+    # синтаксиса FTS5 из пользовательского ввода не интерпретируются
+    tokens = TOKEN_RE.findall(text.lower())
+    return ' AND '.join(f'"{stem(token)}"*' for token in tokens)
+
+
+def search_titles(queryset, text):
+    """Фильтрует произведения полнотекстовым запросом, сортируя по bm25."""
+    match = build_match_query(text)
+    if not match:
+        return queryset
+    if not is_supported():
+        condition = Q()
+        for token in TOKEN_RE.findall(text):
+            condition &= (
+                Q(name__icontains=token) | Q(description__icontains=token))
+        return queryset.filter(condition)
+    title_table = Title._meta.db_table
+    weights = ', '.join(str(weight) for weight in FTS_WEIGHTS)
+    rank = RawSQL(
+        f'SELECT bm25({FTS_TABLE}, {weights}) FROM {FTS_TABLE} '
+        f'WHERE {FTS_TABLE} MATCH %s AND rowid = {title_table}.id',
+        (match, ))
+    # RawSQL в id__in оборачивается в лишние скобки, и SQLite трактует
+    # IN ((SELECT ...)) как список из одного значения
+    return queryset.extra(
+        where=[
+            f'{title_table}.id IN (SELECT rowid FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s)'
+        ],
+        params=[match],
+    ).annotate(search_rank=rank).order_by('search_rank', 'id')
@@ -0,0 +1,191 @@
+from django.db.models.signals import (m2m_changed, post_delete, post_init,
+                                      post_save, pre_delete, pre_save)
+from django.dispatch import receiver
+
+from . import search, trigrams, versions
+from .aggregates import (add_review_score, change_comments_count,
+                         refresh_title_rating)
+from .models import Category, Comment, Genre, Review, Title, User
+
+
+def remember_saved_state(review):
+    # Значения из __dict__, чтобы не загружать отложенные (defer) поля
+    review._saved_score = review.__dict__.get('score')
+    review._saved_title_id = review.__dict__.get('title_id')
+
+
+@receiver(post_init, sender=Title)
+def title_post_init(sender, instance, **kwargs):
+    instance._saved_name = instance.__dict__.get('name')
+
+
+@receiver(post_init, sender=Review)
+def review_post_init(sender, instance, **kwargs):
+    remember_saved_state(instance)
+
+
+@receiver(pre_save, sender=Review)
+def review_pre_save(sender, instance, **kwargs):
+    if instance.pk is None:
+        return
+    if (
+        instance._state.adding
+        or instance._saved_score is None
+        or instance._saved_title_id is None
+    ):
+        saved = Review.objects.filter(
+            pk=instance.pk).values_list('score', 'title_id').first()
+        instance._saved_score, instance._saved_title_id = (
+            saved or (None, None))
+
+
+def bump_review_versions(*title_ids):
+    # titles: у произведения меняется рейтинг
+    versions.bump(versions.TITLES, *(
+        versions.title_reviews(title_id)
+        for title_id in set(title_ids) if title_id is not None
+    ))
+
+
+@receiver(post_save, sender=Review)
+def review_post_save(sender, instance, created, **kwargs):
+    saved = (instance._saved_title_id, instance._saved_score)
+    if created:
+        add_review_score(instance.title_id, instance.score)
+    elif instance._saved_score is None:
+        refresh_title_rating(instance.title_id)
+    elif saved != (instance.title_id, instance.score):
+        add_review_score(*saved, sign=-1)
+        add_review_score(instance.title_id, instance.score)
+    bump_review_versions(instance.title_id, instance._saved_title_id)
+    remember_saved_state(instance)
+
+
+@receiver(post_delete, sender=Review)
+def review_post_delete(sender, instance, **kwargs):
+    add_review_score(instance.title_id, instance.score, sign=-1)
+    bump_review_versions(instance.title_id)
+
+
+def bump_comment_versions(comment):
+    # comments_count выводится в списке отзывов произведения
+    if Comment.review.is_cached(comment):
+        title_id = comment.review.title_id
+    else:
+        title_id = Review.objects.filter(
+            pk=comment.review_id).values_list('title_id', flat=True).first()
+    if title_id is not None:
+        versions.bump(versions.title_reviews(title_id))
+
+
+@receiver(post_save, sender=Comment)
+def comment_post_save(sender, instance, created, **kwargs):
+    if created:
+        change_comments_count(instance.review_id, 1)
+        bump_comment_versions(instance)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_post_delete(sender, instance, **kwargs):
+    if getattr(instance, '_review_deleted', False):
+        # Комментарий удален каскадом вместе с отзывом
+        # (см. cascade_review_comments), версии обновит post_delete отзыва
+        return
+    # При удалении пользователя счетчик уменьшается у каждого отзыва
+    change_comments_count(instance.review_id, -1)
+    bump_comment_versions(instance)
+
+
+@receiver(post_save, sender=Title)
+def title_post_save(sender, instance, created, **kwargs):
+    search.index_titles([instance.pk])
+    if created or instance._saved_name != instance.name:
+        trigrams.index_titles([instance])
+        instance._saved_name = instance.name
+        versions.bump(versions.TITLES, versions.NAMES)
+    else:
+        versions.bump(versions.TITLES)
+
+
+@receiver(post_delete, sender=Title)
+def title_post_delete(sender, instance, **kwargs):
+    search.remove_titles([instance.pk])
+    versions.bump(versions.TITLES, versions.NAMES)
+    # Отзывы удалены каскадом раньше, их версия больше не нужна
+    versions.remove(versions.title_reviews(instance.pk))
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def title_genre_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            search.index_titles([instance.pk])
+    elif action == 'pre_clear':
+        instance._cleared_title_ids = list(
+            instance.titles.values_list('id', flat=True))
+    elif action == 'post_clear':
+        search.index_titles(instance._cleared_title_ids)
+    elif action in ('post_add', 'post_remove'):
+        search.index_titles(pk_set)
+    if action.startswith('post_'):
+        versions.bump(versions.TITLES)
+
+
+# У справочников нет других полей, кроме name и slug
+LOOKUP_VERSIONS = {
+    Category: (versions.CATEGORIES, versions.TITLES, versions.NAMES),
+    Genre: (versions.GENRES, versions.TITLES, versions.NAMES),
+}
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Genre)
+def lookup_post_save(sender, instance, created, **kwargs):
+    if not created:
+        search.index_titles(
+            instance.titles.values_list('id', flat=True))
+    versions.bump(*LOOKUP_VERSIONS[sender])
+
+
+@receiver(pre_delete, sender=Category)
+@receiver(pre_delete, sender=Genre)
+def lookup_pre_delete(sender, instance, **kwargs):
+    # После удаления связи с произведениями уже не найти
+    instance._related_title_ids = list(
+        instance.titles.values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Genre)
+def lookup_post_delete(sender, instance, **kwargs):
+    search.index_titles(getattr(instance, '_related_title_ids', ()))
+    versions.bump(*LOOKUP_VERSIONS[sender])
+
+
+def token_claims(user):
+    return tuple(
+        user.__dict__.get(name) for name in User.TOKEN_CLAIM_FIELDS)
+
+
+@receiver(post_init, sender=User)
+def user_post_init(sender, instance, **kwargs):
+    instance._saved_username = instance.__dict__.get('username')
+    instance._saved_claims = token_claims(instance)
+
+
+@receiver(post_save, sender=User)
+def user_post_save(sender, instance, created, **kwargs):
+    # Имя автора выводится в отзывах и комментариях
+    if not created and instance._saved_username != instance.username:
+        versions.bump(versions.USERS)
+    # Выданные ранее токены перестают подтверждать роль
+    if not created and instance._saved_claims != token_claims(instance):
+        versions.bump(versions.user(instance.pk))
+    instance._saved_username = instance.username
+    instance._saved_claims = token_claims(instance)
+
+
+@receiver(post_delete, sender=User)
+def user_post_delete(sender, instance, **kwargs):
+    # Без записи о версии токены пользователя проверяются по БД
+    versions.remove(versions.user(instance.pk))
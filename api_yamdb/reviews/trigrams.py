@@ -0,0 +1,104 @@
+from django.db.models import Case, Count, IntegerField, When
+
+from .models import Title, TitleTrigram
+
+PADDING = '  '
+# Более короткие запросы похожи почти на любое название
+MIN_QUERY_LENGTH = 3
+# Кандидат должен разделять с запросом хотя бы столько триграмм, иначе
+# кандидатами становится почти вся таблица
+MIN_SHARED_TRIGRAMS = 2
+
+
+def normalize(text):
+    return ' '.join(text.lower().replace('ё', 'е').split())
+
+
+def trigrams(text):
+    padded = PADDING + normalize(text) + PADDING
+    return {padded[index:index + 3] for index in range(len(padded) - 2)}
+
+
+def max_distance(text):
+    # Две правки только для запросов, где после них остается не меньше
+    # MIN_SHARED_TRIGRAMS общих триграмм
+    return 1 if len(normalize(text)) <= 5 else 2
+
+
+def levenshtein(first, second, limit):
+    """Расстояние Левенштейна или limit + 1, если оно больше limit."""
+    if abs(len(first) - len(second)) > limit:
+        return limit + 1
+    previous = list(range(len(second) + 1))
+    for row, first_char in enumerate(first, 1):
+        current = [row]
+        for column, second_char in enumerate(second, 1):
+            current.append(min(
+                previous[column] + 1,
+                current[column - 1] + 1,
+                previous[column - 1] + (first_char != second_char),
+            ))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+def index_titles(titles):
+    titles = list(titles)
+    TitleTrigram.objects.filter(title__in=titles).delete()
+    TitleTrigram.objects.bulk_create(
+        [
+            TitleTrigram(title=title, trigram=trigram)
+            for title in titles
+            for trigram in trigrams(title.name)
+        ],
+        batch_size=500
+    )
+
+
+def rebuild_index():
+    TitleTrigram.objects.all().delete()
+    index_titles(Title.objects.only('id', 'name').iterator())
+
+
+def fuzzy_title_distances(text):
+    """{id: расстояние} для произведений с названием, близким к text.
+
+    Кандидаты отбираются по индексу: правка затрагивает не больше трех
+    триграмм, поэтому при расстоянии d у названия должно быть не меньше
+    len(trigrams(text)) - 3 * d общих триграмм. Расстояние считается
+    только для кандидатов. Запросы короче MIN_QUERY_LENGTH ничего не
+    находят.
+    """
+    query = normalize(text)
+    if len(query) < MIN_QUERY_LENGTH:
+        return {}
+    limit = max_distance(query)
+    query_trigrams = trigrams(query)
+    threshold = max(len(query_trigrams) - 3 * limit, MIN_SHARED_TRIGRAMS)
+    candidates = TitleTrigram.objects.filter(
+        trigram__in=query_trigrams
+    ).values('title_id').annotate(
+        shared=Count('id')
+    ).filter(shared__gte=threshold).values('title_id')
+    distances = {}
+    for title_id, name in Title.objects.filter(
+        id__in=candidates
+    ).values_list('id', 'name'):
+        distance = levenshtein(query, normalize(name), limit)
+        if distance <= limit:
+            distances[title_id] = distance
+    return distances
+
+
+def fuzzy_search_titles(queryset, text):
+    distances = fuzzy_title_distances(text)
+    return queryset.filter(id__in=distances).annotate(
+        fuzzy_distance=Case(
+            *(When(id=pk, then=distance)
+              for pk, distance in distances.items()),
+            default=0,
+            output_field=IntegerField()
+        )
+    ).order_by('fuzzy_distance', 'id')
@@ -0,0 +1,105 @@
+from collections import defaultdict
+from datetime import datetime
+from uuid import uuid4
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Version
+
+# Версии хранятся в таблице Version: ее видят все воркеры, и новая версия
+# становится видна вместе с данными, в той же транзакции
+
+TITLES = 'titles'
+# Только имена и slug произведений, жанров и категорий (автодополнение)
+NAMES = 'names'
+GENRES = 'genres'
+CATEGORIES = 'categories'
+USERS = 'users'
+
+# Сбросы процессных кэшей по ключам, см. subscribe
+LISTENERS = defaultdict(list)
+# Версия ключа без записи в таблице
+MISSING = ('', datetime(1970, 1, 1, tzinfo=timezone.utc))
+
+
+def title_reviews(title_id):
+    return f'title:{title_id}:reviews'
+
+
+def user(user_id):
+    # Меняется вместе с полями User.TOKEN_CLAIM_FIELDS
+    return f'user:{user_id}'
+
+
+def subscribe(key, callback):
+    """Вызывать callback после коммита каждой смены версии key.
+
+    Так процессный кэш видит изменения своего процесса сразу, а не после
+    очередной сверки версии.
+    """
+    LISTENERS[key].append(callback)
+
+
+def new_version():
+    return uuid4().hex, timezone.now()
+
+
+def get_version(key):
+    return get_versions(key)[0]
+
+
+def get_versions(*keys):
+    """Возвращает список (токен, время изменения) для ключей одним запросом.
+
+    Чтение ничего не записывает: для ключа без записи (данные не менялись
+    или ключ удален) возвращается MISSING. Первая же смена версии
+    создает запись с новым токеном.
+    """
+    found = {
+        version.key: (version.token, version.modified)
+        for version in Version.objects.filter(key__in=set(keys))
+    }
+    return [found.get(key, MISSING) for key in keys]
+
+
+def ensure_version(key):
+    """Версия ключа, при необходимости созданная.
+
+    Для значений, которые сверяются с версией позже (токены): MISSING
+    там означал бы, что версия не подтверждена.
+    """
+    version = get_version(key)
+    if version is MISSING:
+        token, modified = new_version()
+        Version.objects.bulk_create(
+            [Version(key=key, token=token, modified=modified)],
+            ignore_conflicts=True)
+        # Запись мог одновременно создать другой процесс
+        version = get_version(key)
+    return version
+
+
+def bump(*keys):
+    # В текущей транзакции: читатели увидят новую версию одновременно
+    # с изменениями, а при откате вернется прежняя
+    keys = set(keys)
+    token, modified = new_version()
+    updated = Version.objects.filter(key__in=keys).update(
+        token=token, modified=modified)
+    if updated < len(keys):
+        # Уже обновленные записи пропускаются из-за конфликта ключа
+        Version.objects.bulk_create([
+            Version(key=key, token=token, modified=modified)
+            for key in keys
+        ], ignore_conflicts=True)
+    for callback in {
+        callback for key in keys for callback in LISTENERS[key]
+    }:
+        transaction.on_commit(callback)
+
+
+def remove(*keys):
+    """Удаляет версии ключей, которые больше не понадобятся (объект
+    удален)."""
+    Version.objects.filter(key__in=set(keys)).delete()
@@ -2,7 +2,7 @@ from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 
 from .forms import UserCreationForm
-from .models import User
+from .models import OutboxMessage, User
 
 
 class YamdbUserAdmin(UserAdmin):
@@ -21,3 +21,17 @@ class YamdbUserAdmin(UserAdmin):
 
 
 admin.site.register(User, YamdbUserAdmin)
+
+
+class OutboxMessageAdmin(admin.ModelAdmin):
+    list_display = (
+        'id', 'to', 'subject', 'created', 'attempts', 'sent_at',
+        'next_attempt_at')
+    list_filter = ('sent_at', )
+    search_fields = ('to', )
+    # Тексты писем пользователям персоналу не показываются
+    exclude = ('body', )
+    raw_id_fields = ('user', )
+
+
+admin.site.register(OutboxMessage, OutboxMessageAdmin)
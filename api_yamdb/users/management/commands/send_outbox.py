@@ -0,0 +1,52 @@
+import time
+
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand
+
+from users.outbox import BATCH_SIZE, deliver_batch
+
+
+class Command(BaseCommand):
+    help = """Sends queued emails from the outbox (users.OutboxMessage)
+    in batches over one EMAIL_BACKEND connection. Failed messages are
+    retried with exponential backoff on later runs. Each batch is claimed
+    in a short transaction and sent with no transaction open, so several
+    workers may run at once; messages of a crashed worker are retried
+    after the claim timeout."""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=BATCH_SIZE,
+            help='Number of messages loaded and updated per query')
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Keep polling the outbox instead of exiting when it is '
+                 'drained')
+        parser.add_argument(
+            '--interval', type=float, default=5.0,
+            help='Seconds between polls with --loop')
+
+    def handle(self, *args, **options):
+        connection = get_connection(fail_silently=False)
+        try:
+            while True:
+                sent, failed = self.drain(connection, options['batch_size'])
+                if sent or failed or not options['loop']:
+                    self.stdout.write(
+                        f'Sent {sent} message(s), failed {failed}')
+                if not options['loop']:
+                    return
+                time.sleep(options['interval'])
+        finally:
+            connection.close()
+
+    def drain(self, connection, batch_size):
+        total_sent = total_failed = 0
+        while True:
+            sent, failed = deliver_batch(connection, batch_size)
+            total_sent += sent
+            total_failed += failed
+            # Неудачные письма отложены, поэтому неполная пачка -
+            # признак того, что готовых к отправке писем не осталось
+            if sent + failed < batch_size:
+                return total_sent, total_failed
@@ -0,0 +1,28 @@
+# Generated by Django 2.2.16 on 2026-10-18 20:07
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def clear_sent_bodies(apps, schema_editor):
+    # В текстах уже отправленных писем лежат коды подтверждения
+    OutboxMessage = apps.get_model('users', 'OutboxMessage')
+    OutboxMessage.objects.filter(sent_at__isnull=False).update(body='')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_outbox_message'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outboxmessage',
+            name='user',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='outbox_messages', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь'),
+        ),
+        migrations.RunPython(
+            clear_sent_bodies, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,6 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.utils import timezone
 
 ROLE_CHOICES = (
     ('user', 'Пользователь'),
@@ -9,6 +10,9 @@ ROLE_CHOICES = (
 
 
 class User(AbstractUser):
+    # Поля, которые JWT передает в claims (см. api/authentication.py)
+    TOKEN_CLAIM_FIELDS = ('username', 'role', 'is_superuser', 'is_active')
+
     email = models.EmailField(unique=True)
     bio = models.TextField(
         verbose_name='Биография',
@@ -32,3 +36,41 @@ class User(AbstractUser):
 
     class Meta:
         ordering = ['id', ]
+
+
+class OutboxMessage(models.Model):
+    # Письмо, записанное в транзакции запроса и отправляемое командой
+    # send_outbox (см. users/outbox.py)
+    subject = models.CharField('Тема', max_length=255)
+    # Код подтверждения не хранится: вместо него в тексте стоит
+    # outbox.CONFIRMATION_CODE, а код для user создается при отправке
+    body = models.TextField('Текст')
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, null=True, blank=True,
+        related_name='outbox_messages', verbose_name='Пользователь'
+    )
+    from_email = models.EmailField('Отправитель')
+    to = models.EmailField('Получатель')
+    created = models.DateTimeField('Создано', auto_now_add=True)
+    attempts = models.PositiveSmallIntegerField(
+        'Попыток отправки', default=0
+    )
+    next_attempt_at = models.DateTimeField(
+        'Следующая попытка', default=timezone.now
+    )
+    sent_at = models.DateTimeField('Отправлено', null=True, blank=True)
+    last_error = models.TextField('Последняя ошибка', blank=True)
+    # Метка воркера, взявшего письмо в отправку; next_attempt_at при этом
+    # сдвигается на outbox.CLAIM_TIMEOUT
+    claim = models.CharField(
+        'Метка отправки', max_length=32, blank=True, editable=False
+    )
+
+    class Meta:
+        ordering = ['id', ]
+        indexes = [
+            models.Index(
+                fields=['sent_at', 'next_attempt_at'],
+                name='outbox_pending_idx'
+            ),
+        ]
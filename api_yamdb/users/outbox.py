@@ -0,0 +1,134 @@
+from contextlib import suppress
+from datetime import timedelta
+from smtplib import SMTPException
+from uuid import uuid4
+
+from django.contrib.auth.tokens import default_token_generator
+from django.core.mail import EmailMessage
+from django.db import connection as db_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutboxMessage
+
+BATCH_SIZE = 100
+# Заменяется кодом подтверждения OutboxMessage.user при отправке
+CONFIRMATION_CODE = '{confirmation_code}'
+# После MAX_ATTEMPTS неудачных попыток письмо остается в таблице с
+# last_error и больше не отправляется
+MAX_ATTEMPTS = 5
+RETRY_DELAY = timedelta(seconds=30)
+MAX_RETRY_DELAY = timedelta(hours=1)
+# Через это время письма упавшего воркера снова готовы к отправке
+CLAIM_TIMEOUT = timedelta(minutes=10)
+
+
+def enqueue(subject, body, from_email, to, user=None):
+    """Записывает письмо в outbox в текущей транзакции.
+
+    CONFIRMATION_CODE в body заменяется кодом подтверждения user только
+    при отправке, поэтому сам код в таблицу не попадает.
+    """
+    return OutboxMessage.objects.create(
+        subject=subject, body=body, from_email=from_email, to=to, user=user)
+
+
+def pending(now):
+    return OutboxMessage.objects.filter(
+        sent_at__isnull=True,
+        next_attempt_at__lte=now,
+        attempts__lt=MAX_ATTEMPTS,
+    ).order_by('id')
+
+
+def claim(batch_size, now):
+    """Берет до batch_size готовых писем в отправку этим воркером.
+
+    Короткая транзакция: письма получают метку и откладываются на
+    CLAIM_TIMEOUT, поэтому другие воркеры их не возьмут, а блокировки
+    не держатся во время отправки.
+    """
+    token = uuid4().hex
+    with transaction.atomic():
+        ids = pending(now)
+        if db_connection.features.has_select_for_update_skip_locked:
+            # Строки, которые сейчас берет другой воркер, пропускаются
+            ids = ids.select_for_update(skip_locked=True)
+        ids = list(ids.values_list('id', flat=True)[:batch_size])
+        # Условие повторяется: без SKIP LOCKED (SQLite) письмо мог
+        # взять другой воркер между чтением и обновлением
+        pending(now).filter(pk__in=ids).update(
+            claim=token, next_attempt_at=now + CLAIM_TIMEOUT)
+    return list(
+        OutboxMessage.objects.filter(claim=token).select_related('user')
+        .order_by('id'))
+
+
+def render_body(message):
+    if message.user is None:
+        return message.body
+    return message.body.replace(
+        CONFIRMATION_CODE, default_token_generator.make_token(message.user))
+
+
+def retry_delay(attempts):
+    # Экспоненциальная задержка: 30 с, 1 мин, 2 мин, ... не больше часа
+    return min(RETRY_DELAY * 2 ** (attempts - 1), MAX_RETRY_DELAY)
+
+
+def send(connection, message, body):
+    """Отправляет письмо; возвращает текст ошибки или None."""
+    email = EmailMessage(
+        message.subject, body, message.from_email, [message.to],
+        connection=connection)
+    try:
+        # open() ничего не делает, если соединение уже открыто
+        connection.open()
+        if connection.send_messages([email]):
+            return None
+        error = 'Backend did not send the message'
+    except (SMTPException, OSError) as exc:
+        error = repr(exc)
+    # После ошибки соединение открывается заново для следующего письма
+    with suppress(SMTPException, OSError):
+        connection.close()
+    return error
+
+
+def deliver_batch(connection, batch_size=BATCH_SIZE, now=None):
+    """Отправляет до batch_size готовых к отправке писем через connection.
+
+    Письма берутся в отправку (claim), отправляются вне транзакции, и
+    результаты сохраняются одним bulk_update во второй короткой
+    транзакции. Доставка at-least-once: если процесс упадет между
+    отправкой и сохранением, письмо уйдет повторно через CLAIM_TIMEOUT.
+    Возвращает (отправлено, ошибок).
+    """
+    now = now or timezone.now()
+    messages = claim(batch_size, now)
+    if not messages:
+        return 0, 0
+    token = messages[0].claim
+    failed = 0
+    for message in messages:
+        message.attempts += 1
+        message.claim = ''
+        error = send(connection, message, render_body(message))
+        if error is None:
+            message.sent_at = now
+            message.last_error = ''
+        else:
+            failed += 1
+            message.last_error = error
+            message.next_attempt_at = now + retry_delay(message.attempts)
+    with transaction.atomic():
+        # После CLAIM_TIMEOUT письмо мог взять другой воркер: его
+        # результат не перезаписывается
+        claimed = set(OutboxMessage.objects.select_for_update().filter(
+            pk__in=[message.pk for message in messages], claim=token,
+        ).values_list('id', flat=True))
+        OutboxMessage.objects.bulk_update(
+            [message for message in messages if message.pk in claimed],
+            ['attempts', 'sent_at', 'next_attempt_at', 'last_error',
+             'claim'])
+    return len(messages) - failed, failed
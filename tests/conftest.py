@@ -1,6 +1,7 @@
 import os
 import sys
 
+import pytest
 from django.utils.version import get_version
 
 root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -34,3 +35,16 @@ assert get_version() < '3.0.0', 'Пожалуйста, используйте в
 pytest_plugins = [
     'tests.fixtures.fixture_user',
 ]
+
+
+@pytest.fixture(autouse=True)
+def reset_process_caches():
+    # Таблица версий очищается после каждого теста, а процессные кэши
+    # иначе сверились бы с ней только через VERSION_CHECK_INTERVAL
+    yield
+    from api.autocomplete import catalog_autocomplete
+    from reviews import authors, lookups
+    for process_cache in (
+        catalog_autocomplete, authors.cache, lookups.categories, lookups.genres
+    ):
+        process_cache.invalidate()
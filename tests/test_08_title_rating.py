@@ -0,0 +1,62 @@
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from .common import auth_client, create_reviews
+
+
+class Test08TitleRating:
+
+    def get_title(self, title_id):
+        from reviews.models import Title
+        return Title.objects.get(pk=title_id)
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_rating_follows_review_changes(self, admin_client, admin):
+        reviews, titles, user, moderator = create_reviews(admin_client, admin)
+        title = self.get_title(titles[0]['id'])
+        assert (title.rating_sum, title.rating_count) == (12, 3), (
+            'Проверьте, что при создании отзыва обновляются `rating_sum` и `rating_count` произведения'
+        )
+        response = auth_client(user).patch(
+            f'/api/v1/titles/{titles[0]["id"]}/reviews/{reviews[1]["id"]}/',
+            data={'score': 9}
+        )
+        assert response.status_code == 200
+        title = self.get_title(titles[0]['id'])
+        assert (title.rating_sum, title.rating_count) == (18, 3), (
+            'Проверьте, что при изменении оценки обновляется `rating_sum` произведения'
+        )
+        response = admin_client.delete(
+            f'/api/v1/titles/{titles[0]["id"]}/reviews/{reviews[0]["id"]}/')
+        assert response.status_code == 204
+        title = self.get_title(titles[0]['id'])
+        assert (title.rating_sum, title.rating_count) == (13, 2), (
+            'Проверьте, что при удалении отзыва обновляются агрегаты произведения'
+        )
+        response = admin_client.get(f'/api/v1/titles/{titles[0]["id"]}/')
+        assert response.json()['rating'] == 6
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_rating_follows_user_cascade(self, admin_client, admin):
+        _, titles, user, _ = create_reviews(admin_client, admin)
+        response = admin_client.delete(f'/api/v1/users/{user.username}/')
+        assert response.status_code == 204
+        title = self.get_title(titles[0]['id'])
+        assert (title.rating_sum, title.rating_count) == (9, 2), (
+            'Проверьте, что при каскадном удалении отзывов пользователя обновляются агрегаты произведения'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_rebuild_aggregates_command(self, admin_client, admin):
+        from reviews.models import Title
+        _, titles, _, _ = create_reviews(admin_client, admin)
+        call_command('rebuild_aggregates', '--check')
+        Title.objects.filter(pk=titles[0]['id']).update(rating_sum=0, rating_count=0)
+        with pytest.raises(CommandError):
+            call_command('rebuild_aggregates', '--check')
+        call_command('rebuild_aggregates')
+        title = self.get_title(titles[0]['id'])
+        assert (title.rating_sum, title.rating_count) == (12, 3), (
+            'Проверьте, что команда `rebuild_aggregates` пересчитывает агрегаты произведения'
+        )
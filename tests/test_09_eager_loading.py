@@ -0,0 +1,55 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from .common import create_comments
+
+
+class Test09EagerLoading:
+
+    def count_queries(self, client, url):
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url)
+        assert response.status_code == 200
+        return len(context.captured_queries)
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_list_queries_do_not_grow(self, admin_client, admin):
+        from reviews.models import Comment, Review, Title
+        _, reviews, titles, _, _ = create_comments(admin_client, admin)
+        title_id, review_id = titles[0]['id'], reviews[0]['id']
+        urls = (
+            '/api/v1/titles/',
+            f'/api/v1/titles/{title_id}/reviews/',
+            f'/api/v1/titles/{title_id}/reviews/{review_id}/comments/',
+            '/api/v1/users/',
+        )
+        before = [self.count_queries(admin_client, url) for url in urls]
+        title = Title.objects.get(pk=title_id)
+        for index in range(3):
+            copy = Title.objects.create(
+                name=f'Копия {index}', year=2000, description='',
+                category=title.category)
+            copy.genre.set(title.genre.all())
+        review = Review.objects.get(pk=review_id)
+        for index in range(2):
+            Comment.objects.create(author=admin, review=review, text=f'{index}')
+        after = [self.count_queries(admin_client, url) for url in urls]
+        assert before == after, (
+            'Проверьте, что количество запросов к БД при GET запросе списка '
+            'не зависит от количества объектов на странице'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_debug_header(self, admin_client, admin):
+        create_comments(admin_client, admin)
+        with override_settings(DEBUG=True):
+            response = admin_client.get('/api/v1/titles/')
+        plan = response.get('X-Eager-Loading-Plan', '')
+        # Категория и жанры выводятся из процессного снимка справочников:
+        # нужны только category_id и id жанров
+        assert 'prefetch_related=genre(only=id)' in plan and 'only=category,' in plan, (
+            'Проверьте, что при DEBUG в заголовке `X-Eager-Loading-Plan` возвращается план загрузки'
+        )
+        response = admin_client.get('/api/v1/titles/')
+        assert 'X-Eager-Loading-Plan' not in response
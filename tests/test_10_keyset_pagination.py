@@ -0,0 +1,64 @@
+import pytest
+
+from .common import create_reviews
+
+
+class Test10KeysetPagination:
+
+    def walk(self, client, url):
+        results, next_url = [], url
+        while next_url:
+            data = client.get(next_url).json()
+            assert 'count' not in data, (
+                'Проверьте, что в режиме `?pagination=cursor` не выполняется подсчет `count`'
+            )
+            results.extend(data['results'])
+            last_page, next_url = data, data['next']
+        return results, last_page
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_titles_cursor_matches_page_numbers(self, admin_client):
+        from reviews.models import Category, Title
+        category = Category.objects.create(name='Кино', slug='cinema')
+        for index in range(12):
+            Title.objects.create(
+                name=f'Произведение {index:02}', year=2000 + index % 3,
+                description='', category=category if index % 2 else None)
+        expected = []
+        for page in (1, 2, 3):
+            expected.extend(
+                admin_client.get(f'/api/v1/titles/?page={page}').json()['results'])
+        results, last_page = self.walk(admin_client, '/api/v1/titles/?pagination=cursor')
+        assert [title['id'] for title in results] == [title['id'] for title in expected], (
+            'Проверьте, что keyset-пагинация `/api/v1/titles/` возвращает все произведения '
+            'в том же порядке, что и постраничная'
+        )
+        data = admin_client.get('/api/v1/titles/?page_size=10').json()
+        assert len(data['results']) == 5, (
+            'Проверьте, что `?page_size=` не меняет размер страницы в постраничном режиме'
+        )
+        previous = admin_client.get(last_page['previous']).json()
+        assert [title['id'] for title in previous['results']] == [
+            title['id'] for title in expected[5:10]], (
+            'Проверьте, что ссылка `previous` возвращает предыдущую страницу'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_reviews_cursor_stable_under_inserts(self, admin_client, admin, django_user_model):
+        from reviews.models import Review, Title
+        reviews, titles, user, moderator = create_reviews(admin_client, admin)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/?pagination=cursor&page_size=2'
+        first = admin_client.get(url).json()
+        assert len(first['results']) == 2 and first['next']
+        newcomer = django_user_model.objects.create_user(
+            username='Newcomer', email='newcomer@yamdb.fake')
+        Review.objects.create(
+            author=newcomer, title=Title.objects.get(pk=titles[0]['id']), text='x', score=1)
+        second = admin_client.get(first['next']).json()
+        ids = [review['id'] for review in first['results'] + second['results']]
+        assert sorted(ids) == sorted(review['id'] for review in reviews), (
+            'Проверьте, что keyset-пагинация отзывов не пропускает и не дублирует записи'
+        )
+        response = admin_client.get(
+            f'/api/v1/titles/{titles[0]["id"]}/reviews/?cursor=broken')
+        assert response.status_code == 404
@@ -0,0 +1,45 @@
+import pytest
+from django.core.management import call_command
+
+from .common import auth_client, create_reviews
+
+
+class Test11RatingDistribution:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_distribution(self, client, admin_client, admin):
+        reviews, titles, user, _ = create_reviews(admin_client, admin)
+        url = f'/api/v1/titles/{titles[0]["id"]}/rating-distribution/'
+        response = client.get(url)
+        assert response.status_code == 200, (
+            'Проверьте, что при GET запросе `/api/v1/titles/{title_id}/rating-distribution/` '
+            'без токена авторизации возвращается статус 200'
+        )
+        data = response.json()
+        assert data['count'] == 3
+        assert data['distribution'] == {
+            str(score): int(score in (3, 4, 5)) for score in range(1, 11)
+        }, (
+            'Проверьте, что `/api/v1/titles/{title_id}/rating-distribution/` возвращает '
+            'количество оценок каждого значения от 1 до 10'
+        )
+        auth_client(user).patch(
+            f'/api/v1/titles/{titles[0]["id"]}/reviews/{reviews[1]["id"]}/',
+            data={'score': 5})
+        admin_client.delete(
+            f'/api/v1/titles/{titles[0]["id"]}/reviews/{reviews[2]["id"]}/')
+        data = client.get(url).json()
+        assert data['count'] == 2 and data['distribution']['5'] == 2, (
+            'Проверьте, что распределение оценок обновляется при изменении и удалении отзывов'
+        )
+        assert data['distribution']['3'] == data['distribution']['4'] == 0
+        call_command('rebuild_aggregates', '--check')
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_distribution_not_found(self, client):
+        response = client.get('/api/v1/titles/999/rating-distribution/')
+        assert response.status_code == 404
+        response = client.get('/api/v1/titles/abc/rating-distribution/')
+        assert response.status_code == 404, (
+            'Проверьте, что нечисловой id произведения возвращает 404, а не 500'
+        )
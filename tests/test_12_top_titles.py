@@ -0,0 +1,45 @@
+import pytest
+from django.core.management import call_command
+
+
+class Test12TopTitles:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_top_uses_weighted_rating(self, client, django_user_model):
+        from reviews.models import Category, Genre, Review, Title
+        films = Category.objects.create(name='Фильм', slug='films')
+        books = Category.objects.create(name='Книги', slug='books')
+        drama = Genre.objects.create(name='Драма', slug='drama')
+        popular = Title.objects.create(name='Популярный', year=2000, description='', category=films)
+        niche = Title.objects.create(name='Нишевый', year=2000, description='', category=films)
+        book = Title.objects.create(name='Книга', year=2000, description='', category=books)
+        Title.objects.create(name='Без отзывов', year=2000, description='', category=films)
+        popular.genre.add(drama)
+        for index in range(30):
+            author = django_user_model.objects.create_user(
+                username=f'user{index}', email=f'user{index}@yamdb.fake')
+            Review.objects.create(author=author, title=popular, text='', score=9)
+            if index < 2:
+                Review.objects.create(author=author, title=niche, text='', score=10)
+            if index < 5:
+                Review.objects.create(author=author, title=book, text='', score=3)
+        call_command('compute_weighted_ratings', '--min-votes', '10')
+
+        response = client.get('/api/v1/titles/top/')
+        assert response.status_code == 200, (
+            'Проверьте, что при GET запросе `/api/v1/titles/top/` без токена авторизации '
+            'возвращается статус 200'
+        )
+        names = [title['name'] for title in response.json()['results']]
+        assert names == ['Популярный', 'Нишевый', 'Книга'], (
+            'Проверьте, что `/api/v1/titles/top/` упорядочивает произведения по взвешенному рейтингу '
+            'и не включает произведения без отзывов'
+        )
+        names = [title['name'] for title in client.get('/api/v1/titles/top/?category=books').json()['results']]
+        assert names == ['Книга']
+        names = [title['name'] for title in client.get('/api/v1/titles/top/?genre=drama').json()['results']]
+        assert names == ['Популярный']
+        data = client.get('/api/v1/titles/top/?pagination=cursor&page_size=2').json()
+        second = client.get(data['next']).json()
+        assert [title['name'] for title in data['results'] + second['results']] == [
+            'Популярный', 'Нишевый', 'Книга']
@@ -0,0 +1,49 @@
+import pytest
+from django.core.management import call_command
+
+from .common import create_titles
+
+
+class Test13TitleSearch:
+
+    def search(self, client, query):
+        response = client.get('/api/v1/titles/', data=query)
+        assert response.status_code == 200
+        return [title['name'] for title in response.json()['results']]
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_search(self, client, admin_client):
+        create_titles(admin_client)
+        assert self.search(client, {'search': 'пике'}) == ['Поворот туда'], (
+            'Проверьте, что фильтр `search` ищет по описанию произведения'
+        )
+        assert self.search(client, {'search': 'драмы'}) == ['Проект'], (
+            'Проверьте, что фильтр `search` находит разные формы слова и ищет по жанрам'
+        )
+        assert self.search(client, {'search': 'фильм'}) == ['Поворот туда'], (
+            'Проверьте, что фильтр `search` ищет по названию категории'
+        )
+        assert self.search(client, {'search': 'драма', 'category': 'films'}) == [], (
+            'Проверьте, что фильтр `search` сочетается с остальными фильтрами'
+        )
+        assert self.search(client, {'search': '"AND (*'}) == []
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_index_follows_changes(self, client, admin_client):
+        from reviews.models import Category, Genre, Title
+        titles, _, _ = create_titles(admin_client)
+        Genre.objects.filter(slug='drama').update(name='Трагедия')
+        genre = Genre.objects.get(slug='drama')
+        genre.save()
+        assert self.search(client, {'search': 'трагедия'}) == ['Проект'], (
+            'Проверьте, что индекс обновляется при изменении жанра'
+        )
+        Category.objects.get(slug='books').delete()
+        assert self.search(client, {'search': 'книги'}) == []
+        admin_client.patch(
+            f'/api/v1/titles/{titles[0]["id"]}/', data={'name': 'Разворот'})
+        assert self.search(client, {'search': 'разворот'}) == ['Разворот']
+        Title.objects.get(pk=titles[1]['id']).delete()
+        assert self.search(client, {'search': 'главная'}) == []
+        call_command('rebuild_search_index')
+        assert self.search(client, {'search': 'крутое'}) == ['Разворот']
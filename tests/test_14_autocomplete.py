@@ -0,0 +1,52 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .common import create_titles
+
+
+class Test14Autocomplete:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_autocomplete(self, client, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        response = client.get('/api/v1/autocomplete/', data={'q': 'По'})
+        assert response.status_code == 200, (
+            'Проверьте, что при GET запросе `/api/v1/autocomplete/` без токена авторизации '
+            'возвращается статус 200'
+        )
+        assert [title['name'] for title in response.json()['titles']] == ['Поворот туда'], (
+            'Проверьте, что `/api/v1/autocomplete/` подсказывает произведения по префиксу названия'
+        )
+        data = client.get('/api/v1/autocomplete/', data={'q': 'туд'}).json()
+        assert [title['name'] for title in data['titles']] == ['Поворот туда'], (
+            'Проверьте, что `/api/v1/autocomplete/` ищет префикс с начала любого слова'
+        )
+        data = client.get('/api/v1/autocomplete/', data={'q': 'ко'}).json()
+        assert data['genres'] == [{'name': 'Комедия', 'slug': 'comedy'}]
+        data = client.get('/api/v1/autocomplete/', data={'q': 'кни'}).json()
+        assert data['categories'] == [{'name': 'Книги', 'slug': 'books'}]
+
+        with CaptureQueriesContext(connection) as context:
+            client.get('/api/v1/autocomplete/', data={'q': 'пр'})
+        assert not context.captured_queries, (
+            'Проверьте, что `/api/v1/autocomplete/` не обращается к БД, если данные не менялись'
+        )
+
+        from api.autocomplete import catalog_autocomplete
+        indexes = catalog_autocomplete.get_indexes()
+        admin_client.post(f'/api/v1/titles/{titles[0]["id"]}/reviews/', data={'text': 'Отзыв', 'score': 7})
+        admin_client.patch(f'/api/v1/titles/{titles[0]["id"]}/', data={'year': 2001})
+        client.get('/api/v1/autocomplete/', data={'q': 'пр'})
+        assert catalog_autocomplete.indexes is indexes, (
+            'Проверьте, что отзывы и изменения полей, кроме имени, не перестраивают индекс'
+        )
+        admin_client.patch(f'/api/v1/titles/{titles[0]["id"]}/', data={'name': 'Поворот обратно'})
+        data = client.get('/api/v1/autocomplete/', data={'q': 'обр'}).json()
+        assert [title['name'] for title in data['titles']] == ['Поворот обратно']
+
+        admin_client.post('/api/v1/genres/', data={'name': 'Комикс', 'slug': 'comics'})
+        data = client.get('/api/v1/autocomplete/', data={'q': 'ком'}).json()
+        assert [genre['slug'] for genre in data['genres']] == ['comedy', 'comics'], (
+            'Проверьте, что индекс `/api/v1/autocomplete/` обновляется после изменения данных'
+        )
@@ -0,0 +1,68 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .common import create_titles
+
+
+class Test15FuzzySearch:
+
+    def fuzzy(self, client, query):
+        response = client.get('/api/v1/titles/', data={'fuzzy': query})
+        assert response.status_code == 200
+        return [title['name'] for title in response.json()['results']]
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_fuzzy(self, client, admin_client):
+        from reviews.models import Title
+        from reviews.trigrams import fuzzy_title_distances, rebuild_index
+        titles, _, _ = create_titles(admin_client)
+        assert self.fuzzy(client, 'Паворот туда') == ['Поворот туда'], (
+            'Проверьте, что фильтр `fuzzy` находит произведения с опечаткой в названии'
+        )
+        assert self.fuzzy(client, 'прАэкт') == ['Проект']
+        assert self.fuzzy(client, 'Совсем другое') == []
+        admin_client.patch(f'/api/v1/titles/{titles[1]["id"]}/', data={'name': 'Прожект'})
+        assert self.fuzzy(client, 'прожэкт') == ['Прожект'], (
+            'Проверьте, что индекс триграмм обновляется при изменении названия'
+        )
+        Title.objects.bulk_create(
+            Title(name=f'Шум {index}', year=2000, description='') for index in range(50))
+        rebuild_index()
+        with CaptureQueriesContext(connection) as context:
+            distances = fuzzy_title_distances('Пворот туда')
+        assert list(distances.values()) == [1]
+        assert len(context.captured_queries) == 1, (
+            'Проверьте, что кандидаты для нечеткого поиска отбираются одним запросом по индексу триграмм'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_short_queries(self, monkeypatch):
+        from reviews import trigrams
+        from reviews.models import Title
+        Title.objects.bulk_create(
+            Title(name=f'Кар{index}а', year=2000, description='') for index in range(60))
+        for name in ('Кот', 'Кит', 'Крот', 'Книги'):
+            Title.objects.create(name=name, year=2000, description='')
+        trigrams.rebuild_index()
+        scored = []
+        levenshtein = trigrams.levenshtein
+
+        def counting_levenshtein(first, second, limit):
+            scored.append(second)
+            return levenshtein(first, second, limit)
+        monkeypatch.setattr(trigrams, 'levenshtein', counting_levenshtein)
+
+        names = dict(Title.objects.values_list('id', 'name'))
+        distances = trigrams.fuzzy_title_distances('кот')
+        assert sorted(names[pk] for pk in distances) == ['Кит', 'Кот', 'Крот']
+        assert len(scored) <= 4, (
+            'Проверьте, что короткий запрос не делает кандидатами все произведения'
+        )
+        scored.clear()
+        distances = trigrams.fuzzy_title_distances('книга')
+        assert [names[pk] for pk in distances] == ['Книги']
+        assert len(scored) <= 4
+        assert trigrams.fuzzy_title_distances('ко') == {}, (
+            'Проверьте, что слишком короткий запрос ничего не находит'
+        )
@@ -0,0 +1,51 @@
+import itertools
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .common import create_titles
+
+FILTERS = {'category': 'films', 'genre': 'drama', 'name': 'ворот', 'year': 2000}
+
+
+def query_plan(sql):
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def bad_steps(plan):
+    return [
+        step for step in plan
+        if (step.startswith('SCAN ') and ' USING ' not in step)
+        or 'TEMP B-TREE' in step
+    ]
+
+
+class Test16TitleQueryPlans:
+
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.parametrize('combination', [
+        combination
+        for size in range(len(FILTERS) + 1)
+        for combination in itertools.combinations(FILTERS, size)
+    ])
+    def test_01_title_filter_plans(self, client, admin_client, combination):
+        create_titles(admin_client)
+        params = {name: FILTERS[name] for name in combination}
+        with CaptureQueriesContext(connection) as context:
+            response = client.get('/api/v1/titles/', data=params)
+        assert response.status_code == 200
+        title_queries = [
+            query for query in context.captured_queries
+            if 'FROM "reviews_title"' in query['sql']
+        ]
+        assert title_queries
+        for query in title_queries:
+            plan = query_plan(query['sql'])
+            assert not bad_steps(plan), (
+                f'Запрос `/api/v1/titles/` с фильтрами {combination} выполняет полный '
+                f'просмотр таблицы или сортировку во временном B-дереве:\n'
+                f'{query["sql"]}\n{plan}'
+            )
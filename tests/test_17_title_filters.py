@@ -0,0 +1,60 @@
+import pytest
+
+from .common import create_reviews
+
+
+class Test17TitleFilters:
+
+    def names(self, client, **params):
+        response = client.get('/api/v1/titles/', data=params)
+        assert response.status_code == 200, (
+            f'Проверьте, что `/api/v1/titles/` с фильтрами {params} возвращает статус 200'
+        )
+        data = response.json()
+        names = [title['name'] for title in data['results']]
+        assert data['count'] == len(names), (
+            'Проверьте, что фильтры по нескольким жанрам не дублируют произведения'
+        )
+        return sorted(names)
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_genre_and_category_lists(self, client, admin_client, admin):
+        create_reviews(admin_client, admin)
+        assert self.names(client, genre='drama') == ['Проект']
+        assert self.names(client, genre='horror,comedy') == ['Поворот туда'], (
+            'Проверьте, что произведение с несколькими подходящими жанрами возвращается один раз'
+        )
+        assert self.names(client, genre='horror,drama') == ['Поворот туда', 'Проект']
+        assert self.names(client, genre='horror,comedy', genre_match='all') == ['Поворот туда']
+        assert self.names(client, genre='horror,drama', genre_match='all') == [], (
+            'Проверьте, что `genre_match=all` требует наличия всех жанров'
+        )
+        assert self.names(client, category='films,books') == ['Поворот туда', 'Проект']
+        assert self.names(client, category='books') == ['Проект']
+        assert self.names(client, category='unknown') == []
+        assert self.names(client, genre='unknown') == [], (
+            'Проверьте, что фильтр по несуществующему жанру возвращает пустой список'
+        )
+        response = client.get('/api/v1/titles/', data={'genre_match': 'some'})
+        assert response.status_code == 400
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_year_and_rating_ranges(self, client, admin_client, admin):
+        _, titles, _, _ = create_reviews(admin_client, admin)
+        assert self.names(client, rating_min=1) == ['Поворот туда'], (
+            'Проверьте, что фильтры по рейтингу исключают произведения без оценок'
+        )
+        admin_client.post(
+            f'/api/v1/titles/{titles[1]["id"]}/reviews/', data={'text': 'Отлично', 'score': 9})
+        assert self.names(client, year_min=2001) == ['Проект']
+        assert self.names(client, year_max=2000) == ['Поворот туда']
+        assert self.names(client, year_min=2000, year_max=2020) == ['Поворот туда', 'Проект']
+        assert self.names(client, rating_min=4) == ['Поворот туда', 'Проект'], (
+            'Проверьте, что `rating_min` включает произведения с рейтингом, равным границе'
+        )
+        assert self.names(client, rating_min=4.5) == ['Проект']
+        assert self.names(client, rating_max=4) == ['Поворот туда']
+        assert self.names(client, rating_min=4, rating_max=9, genre='horror,drama') == [
+            'Поворот туда', 'Проект'
+        ]
+        assert self.names(client, rating_min=9.5) == []
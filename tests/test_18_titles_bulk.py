@@ -0,0 +1,158 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .common import create_titles
+
+
+def bulk_items(prefix, count):
+    return [
+        {
+            'name': f'{prefix} {index}', 'year': 1990 + index % 30,
+            'description': 'Описание', 'genre': ['horror', 'drama'],
+            'category': 'films',
+        }
+        for index in range(count)
+    ]
+
+
+class Test18TitlesBulk:
+    url = '/api/v1/titles/bulk/'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_bulk_create_and_update(self, client, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        items = [
+            {
+                'id': titles[0]['id'], 'name': 'Поворот обратно', 'year': 2001,
+                'description': 'Продолжение', 'genre': ['drama'], 'category': 'books',
+            },
+            {
+                'name': 'Новинка', 'year': 2010, 'description': 'Новое',
+                'genre': ['comedy', 'horror'], 'category': 'films',
+            },
+        ]
+        response = admin_client.post(self.url, data=items, format='json')
+        assert response.status_code == 200, (
+            'Проверьте, что POST `/api/v1/titles/bulk/` создает и обновляет произведения'
+        )
+        data = response.json()
+        assert [title['name'] for title in data] == ['Поворот обратно', 'Новинка']
+        assert data[0]['id'] == titles[0]['id']
+        assert data[0]['genre'] == ['drama'] and data[0]['category'] == 'books'
+        assert sorted(data[1]['genre']) == ['comedy', 'horror']
+
+        response = client.get(f'/api/v1/titles/{data[1]["id"]}/')
+        assert response.json()['name'] == 'Новинка'
+        names = [title['name'] for title in client.get(
+            '/api/v1/titles/', data={'genre': 'drama'}).json()['results']]
+        assert sorted(names) == ['Поворот обратно', 'Проект'], (
+            'Проверьте, что жанры обновленного произведения заменяются'
+        )
+        response = client.get('/api/v1/titles/', data={'search': 'новинка'})
+        assert [title['name'] for title in response.json()['results']] == ['Новинка'], (
+            'Проверьте, что массовое создание обновляет поисковый индекс'
+        )
+        response = client.get('/api/v1/titles/', data={'fuzzy': 'Поворот обратна'})
+        assert [title['name'] for title in response.json()['results']] == ['Поворот обратно']
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_bulk_errors(self, client, user_client, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        items = [
+            {
+                'name': 'Корректное', 'year': 2000, 'description': 'Описание',
+                'genre': ['drama'], 'category': 'films',
+            },
+            {
+                'name': 'Проект', 'year': 2000, 'description': 'Описание',
+                'genre': ['drama'], 'category': 'films',
+            },
+            {
+                'id': 100500, 'name': 'Другое', 'year': 2000, 'description': 'Описание',
+                'genre': ['drama'], 'category': 'films',
+            },
+            {
+                'name': 'Будущее', 'year': 3000, 'description': 'Описание',
+                'genre': ['drama', 'unknown'], 'category': 'unknown',
+            },
+            {
+                'name': 'Корректное', 'year': 2000, 'description': 'Описание',
+                'genre': ['drama'], 'category': 'films',
+            },
+            {
+                'id': titles[1]['id'], 'name': 'Проект 2', 'year': 2020,
+                'description': 'Описание', 'genre': ['drama'], 'category': 'books',
+            },
+        ]
+        assert user_client.post(self.url, data=items, format='json').status_code == 403
+        response = admin_client.post(self.url, data=items, format='json')
+        assert response.status_code == 400
+        errors = response.json()
+        assert len(errors) == len(items), (
+            'Проверьте, что ошибки возвращаются для каждого элемента списка'
+        )
+        assert errors[0] == {} and errors[5] == {}
+        assert set(errors[1]) == {'name'}, (
+            'Проверьте, что занятое другим произведением название приводит к ошибке элемента'
+        )
+        assert set(errors[2]) == {'id'}
+        assert set(errors[3]) == {'year', 'genre', 'category'}
+        assert set(errors[4]) == {'name'}, (
+            'Проверьте, что повтор названия внутри пачки приводит к ошибке элемента'
+        )
+        assert client.get('/api/v1/titles/').json()['count'] == 2, (
+            'Проверьте, что при ошибке ни одно произведение не сохраняется'
+        )
+        response = admin_client.post(self.url, data={'name': 'Не список'}, format='json')
+        assert response.status_code == 400
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_bulk_query_count(self, admin_client):
+        create_titles(admin_client)
+        query_counts = []
+        for prefix, count in (('Малая', 2), ('Большая', 40)):
+            with CaptureQueriesContext(connection) as context:
+                response = admin_client.post(
+                    self.url, data=bulk_items(prefix, count), format='json')
+            assert response.status_code == 200
+            assert len(response.json()) == count
+            query_counts.append(len(context.captured_queries))
+        assert query_counts[0] == query_counts[1], (
+            'Проверьте, что число запросов `/api/v1/titles/bulk/` не зависит от размера пачки'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_bulk_limits(self, admin_client):
+        response = admin_client.post(
+            self.url, data=bulk_items('Много', 501), format='json')
+        assert response.status_code == 400, (
+            'Проверьте, что пачка ограничена 500 произведениями'
+        )
+        create_titles(admin_client)
+        response = admin_client.post(
+            self.url, data=bulk_items('Много', 500), format='json')
+        assert response.status_code == 200
+        assert len(response.json()) == 500
+
+    @pytest.mark.django_db(transaction=True)
+    def test_05_bulk_concurrent_name(self, admin_client, monkeypatch):
+        from api import serializers
+        from reviews.models import Title
+        create_titles(admin_client)
+        save_titles = serializers.save_titles
+
+        def save_after_concurrent_insert(items):
+            # Параллельный запрос успевает занять название после проверки
+            Title.objects.create(name='Гонка 1', year=2000, description='')
+            return save_titles(items)
+        monkeypatch.setattr(
+            serializers, 'save_titles', save_after_concurrent_insert)
+        response = admin_client.post(
+            self.url, data=bulk_items('Гонка', 3), format='json')
+        assert response.status_code == 400, (
+            'Проверьте, что занятое параллельно название приводит к ошибке 400, а не 500'
+        )
+        errors = response.json()
+        assert errors[0] == {} and errors[2] == {}
+        assert set(errors[1]) == {'name'}
@@ -0,0 +1,44 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .common import create_titles
+
+
+class Test19TitlesMultiget:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_titles_by_ids(self, client, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        first, second = titles[0]['id'], titles[1]['id']
+        response = client.get('/api/v1/titles/', data={'ids': f'{second},100500,{first},{second}'})
+        assert response.status_code == 200
+        data = response.json()
+        assert [title['id'] for title in data] == [second, first], (
+            'Проверьте, что `?ids=` возвращает произведения в порядке id в запросе, '
+            'пропуская несуществующие и повторы'
+        )
+        assert data[1] == client.get(f'/api/v1/titles/{first}/').json(), (
+            'Проверьте, что `?ids=` сериализует произведения так же, как `/api/v1/titles/{id}/`'
+        )
+        assert client.get('/api/v1/titles/', data={'ids': f'{first}', 'category': 'books'}).json() == []
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_ids_limits(self, client, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        ids = [title['id'] for title in titles] + list(range(100500, 100599))
+        response = client.get('/api/v1/titles/', data={'ids': ','.join(map(str, ids))})
+        assert response.status_code == 400, (
+            'Проверьте, что число id в `?ids=` ограничено'
+        )
+        assert client.get('/api/v1/titles/', data={'ids': '1,a'}).status_code == 400
+        with CaptureQueriesContext(connection) as context:
+            response = client.get('/api/v1/titles/', data={'ids': ','.join(map(str, ids[:-1]))})
+        assert len(response.json()) == len(titles)
+        queries = [
+            query for query in context.captured_queries
+            if 'reviews_version' not in query['sql']
+        ]
+        assert len(queries) == 2, (
+            'Проверьте, что `?ids=` загружает произведения одним запросом и жанры - одним'
+        )
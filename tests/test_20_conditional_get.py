@@ -0,0 +1,128 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .common import auth_client, create_reviews, create_titles
+
+
+class Test20ConditionalGet:
+
+    def assert_not_modified(self, client, url, response):
+        etag = response['ETag']
+        with CaptureQueriesContext(connection) as context:
+            cached = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert cached.status_code == 304, (
+            f'Проверьте, что `{url}` с совпадающим If-None-Match возвращает статус 304'
+        )
+        assert cached['ETag'] == etag
+        assert len(context.captured_queries) == 1 and (
+            'reviews_version' in context.captured_queries[0]['sql']
+        ), (
+            f'Проверьте, что для ответа 304 на `{url}` читаются только версии данных'
+        )
+        cached = client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        assert cached.status_code == 304
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_catalog(self, client, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        for url in ('/api/v1/titles/', '/api/v1/categories/', '/api/v1/genres/',
+                    f'/api/v1/titles/{titles[0]["id"]}/'):
+            response = client.get(url)
+            assert response.status_code == 200
+            assert response.has_header('ETag') and response.has_header('Last-Modified'), (
+                f'Проверьте, что `{url}` возвращает заголовки ETag и Last-Modified'
+            )
+            self.assert_not_modified(client, url, response)
+
+        titles_etag = client.get('/api/v1/titles/')['ETag']
+        genres_etag = client.get('/api/v1/genres/')['ETag']
+        categories_etag = client.get('/api/v1/categories/')['ETag']
+        admin_client.post('/api/v1/genres/', data={'name': 'Мюзикл', 'slug': 'musical'})
+        response = client.get('/api/v1/genres/', HTTP_IF_NONE_MATCH=genres_etag)
+        assert response.status_code == 200, (
+            'Проверьте, что создание жанра меняет ETag списка жанров'
+        )
+        assert client.get(
+            '/api/v1/categories/', HTTP_IF_NONE_MATCH=categories_etag).status_code == 304
+        admin_client.patch(f'/api/v1/titles/{titles[0]["id"]}/', data={'year': 1999})
+        response = client.get('/api/v1/titles/', HTTP_IF_NONE_MATCH=titles_etag)
+        assert response.status_code == 200, (
+            'Проверьте, что изменение произведения меняет ETag списка произведений'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_reviews(self, client, admin_client, admin):
+        reviews, titles, user, _ = create_reviews(admin_client, admin)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        other_url = f'/api/v1/titles/{titles[1]["id"]}/reviews/'
+        response = client.get(url)
+        self.assert_not_modified(client, url, response)
+        other_etag = client.get(other_url)['ETag']
+        titles_etag = client.get('/api/v1/titles/')['ETag']
+
+        admin_client.patch(f'{url}{reviews[0]["id"]}/', data={'score': 1})
+        assert client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code == 200, (
+            'Проверьте, что изменение отзыва меняет ETag списка отзывов произведения'
+        )
+        assert client.get(other_url, HTTP_IF_NONE_MATCH=other_etag).status_code == 304, (
+            'Проверьте, что ETag отзывов зависит только от отзывов своего произведения'
+        )
+        assert client.get('/api/v1/titles/', HTTP_IF_NONE_MATCH=titles_etag).status_code == 200, (
+            'Проверьте, что изменение оценки меняет ETag списка произведений (рейтинг)'
+        )
+
+        etag = client.get(url)['ETag']
+        auth_client(user).patch('/api/v1/users/me/', data={'username': 'Renamed'})
+        assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 200, (
+            'Проверьте, что смена имени пользователя меняет ETag списков отзывов'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_shared_versions(self, client, admin_client):
+        from reviews import versions
+        from reviews.models import Version
+        create_titles(admin_client)
+        etag = client.get('/api/v1/titles/')['ETag']
+        # Так версию меняет запись в другом процессе: сигналы этого
+        # процесса о ней не знают
+        Version.objects.filter(key=versions.TITLES).update(token='other')
+        assert client.get('/api/v1/titles/', HTTP_IF_NONE_MATCH=etag).status_code == 200, (
+            'Проверьте, что версии данных общие для всех процессов'
+        )
+        Version.objects.all().delete()
+        assert client.get('/api/v1/titles/', HTTP_IF_NONE_MATCH=etag).status_code == 200, (
+            'Проверьте, что потерянная версия не подтверждает старый ETag'
+        )
+        assert not Version.objects.exists(), (
+            'Проверьте, что GET не записывает версии данных'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_reads_do_not_write_versions(self, client, admin_client, admin):
+        from reviews import versions
+        from reviews.models import Version
+        reviews, titles, user, _ = create_reviews(admin_client, admin)
+        keys = set(Version.objects.values_list('key', flat=True))
+        for title_id in range(900001, 900006):
+            assert client.get(f'/api/v1/titles/{title_id}/reviews/').status_code == 404
+        assert set(Version.objects.values_list('key', flat=True)) == keys, (
+            'Проверьте, что запросы к несуществующим произведениям не создают версии'
+        )
+        title_id = titles[0]['id']
+        assert Version.objects.filter(key=versions.title_reviews(title_id)).exists()
+        admin_client.delete(f'/api/v1/titles/{title_id}/')
+        assert not Version.objects.filter(key=versions.title_reviews(title_id)).exists(), (
+            'Проверьте, что удаление произведения удаляет версию его отзывов'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_05_etag_depends_on_format(self, client, admin_client):
+        create_titles(admin_client)
+        etag = client.get('/api/v1/genres/')['ETag']
+        response = client.get(
+            '/api/v1/genres/', HTTP_ACCEPT='text/html', HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200, (
+            'Проверьте, что HTML и JSON представления имеют разные ETag'
+        )
+        assert response['ETag'] != etag
@@ -0,0 +1,82 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .common import create_titles
+
+LOOKUP_TABLES = ('"reviews_category"', '"reviews_genre"')
+
+
+def lookup_queries(context):
+    return [
+        query['sql'] for query in context.captured_queries
+        if any(table in query['sql'] for table in LOOKUP_TABLES)
+    ]
+
+
+class Test21LookupSnapshot:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_no_lookup_queries(self, client, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        client.get('/api/v1/titles/')
+        with CaptureQueriesContext(connection) as context:
+            response = client.get('/api/v1/titles/', data={'category': 'films,books'})
+        assert response.status_code == 200
+        title = next(
+            title for title in response.json()['results'] if title['id'] == titles[0]['id'])
+        assert title['category'] == {'name': 'Фильм', 'slug': 'films'}
+        assert title['genre'] == [
+            {'name': 'Ужасы', 'slug': 'horror'}, {'name': 'Комедия', 'slug': 'comedy'}]
+        queries = lookup_queries(context)
+        assert len(queries) == 1 and '"reviews_category"' not in queries[0], (
+            'Проверьте, что категории берутся из процессного снимка, '
+            'а жанры загружаются только по id'
+        )
+        with CaptureQueriesContext(connection) as context:
+            client.get('/api/v1/titles/', data={'genre': 'drama,horror', 'category': 'films'})
+            response = admin_client.post('/api/v1/titles/', data={
+                'name': 'Новинка', 'year': 2000, 'description': 'Новое',
+                'genre': ['drama'], 'category': 'books',
+            })
+        assert response.status_code == 201
+        assert response.json()['genre'] == ['drama'] and response.json()['category'] == 'books'
+        assert not [sql for sql in lookup_queries(context) if '."slug" IN' in sql or '."slug" =' in sql], (
+            'Проверьте, что фильтры и сериализатор создания находят жанры и категории по slug без запросов'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_invalidation(self, client, admin_client):
+        from reviews import lookups, versions
+        from reviews.models import Category, Version
+        titles, _, _ = create_titles(admin_client)
+        url = f'/api/v1/titles/{titles[0]["id"]}/'
+        assert client.get(url).json()['category']['name'] == 'Фильм'
+        # Так выглядит изменение из другого процесса: данные и версия
+        # меняются в БД без сигналов этого процесса
+        Category.objects.filter(slug='films').update(name='Кино', slug='movies')
+        Version.objects.filter(key=versions.CATEGORIES).update(token='other')
+        assert client.get(url).json()['category']['name'] == 'Фильм'
+        response = admin_client.patch(url, data={'category': 'films'})
+        assert response.status_code == 400, (
+            'Проверьте, что запись сверяет снимок с версией в БД и не принимает устаревший slug'
+        )
+        assert client.get(url).json()['category'] == {'name': 'Кино', 'slug': 'movies'}, (
+            'Проверьте, что снимок перечитывается при смене общей версии'
+        )
+        Category.objects.filter(slug='movies').update(name='Кинофильм')
+        Version.objects.filter(key=versions.CATEGORIES).update(token='another')
+        lookups.categories.checked_at -= lookups.VERSION_CHECK_INTERVAL
+        assert client.get(url).json()['category']['name'] == 'Кинофильм', (
+            'Проверьте, что чтение сверяет снимок с версией в БД не реже раза в VERSION_CHECK_INTERVAL'
+        )
+        category = Category.objects.get(slug='movies')
+        category.name = 'Фильмы'
+        category.save()
+        assert client.get(url).json()['category']['name'] == 'Фильмы', (
+            'Проверьте, что сохранение категории сразу сбрасывает снимок процесса'
+        )
+        admin_client.post('/api/v1/genres/', data={'name': 'Мюзикл', 'slug': 'musical'})
+        response = admin_client.patch(url, data={'genre': ['musical']})
+        assert response.status_code == 200
+        assert client.get(url).json()['genre'] == [{'name': 'Мюзикл', 'slug': 'musical'}]
@@ -0,0 +1,65 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .common import create_comments
+
+
+class Test22SparseFieldsets:
+
+    def get(self, client, url, params, column):
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url, data=params)
+        assert response.status_code == 200, (
+            f'Проверьте, что `{url}` с параметрами {params} возвращает статус 200'
+        )
+        data = response.json()
+        results = data['results'] if 'results' in data else [data]
+        assert results
+        # Пользователь для аутентификации загружается целиком
+        queries = [
+            query['sql'] for query in context.captured_queries
+            if '"users_user"."password"' not in query['sql']
+        ]
+        assert not [sql for sql in queries if column in sql], (
+            f'Проверьте, что `{url}` с параметрами {params} не читает колонку {column}'
+        )
+        return results
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_fields_and_omit(self, admin_client, admin):
+        comments, reviews, titles, _, _ = create_comments(admin_client, admin)
+        title_id, review_id = titles[0]['id'], reviews[0]['id']
+        column = '"reviews_title"."description"'
+        for title in self.get(admin_client, '/api/v1/titles/', {'fields': 'id,name,rating'}, column):
+            assert list(title) == ['id', 'name', 'rating'], (
+                'Проверьте, что `?fields=` оставляет в ответе только перечисленные поля'
+            )
+        title = self.get(admin_client, f'/api/v1/titles/{title_id}/', {'omit': 'description,genre'}, column)[0]
+        assert list(title) == ['id', 'name', 'year', 'rating', 'reviews_count', 'category'], (
+            'Проверьте, что `?omit=` убирает перечисленные поля из ответа'
+        )
+        assert title['rating'] == 4
+
+        url = f'/api/v1/titles/{title_id}/reviews/'
+        for review in self.get(admin_client, url, {'fields': 'id,score,author'}, '"reviews_review"."text"'):
+            assert list(review) == ['id', 'author', 'score']
+        comments_url = f'{url}{review_id}/comments/'
+        for comment in self.get(
+            admin_client, comments_url,
+            {'omit': 'text', 'pagination': 'cursor'}, '"reviews_comment"."text"'
+        ):
+            assert list(comment) == ['id', 'author', 'pub_date']
+        users = self.get(admin_client, '/api/v1/users/', {'fields': 'username'}, '"users_user"."bio"')
+        assert all(list(user) == ['username'] for user in users)
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_unknown_fields(self, admin_client, admin):
+        _, _, titles, _, _ = create_comments(admin_client, admin)
+        response = admin_client.get('/api/v1/titles/', data={'fields': 'id,unknown'})
+        assert response.status_code == 400, (
+            'Проверьте, что неизвестное поле в `?fields=` приводит к ошибке 400'
+        )
+        response = admin_client.get(
+            f'/api/v1/titles/{titles[0]["id"]}/reviews/', data={'omit': 'unknown'})
+        assert response.status_code == 400
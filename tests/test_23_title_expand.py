@@ -0,0 +1,54 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .common import create_reviews
+
+
+class Test23TitleExpand:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_expand_reviews(self, client, admin_client, admin):
+        reviews, titles, _, _ = create_reviews(admin_client, admin)
+        url = f'/api/v1/titles/{titles[0]["id"]}/'
+        reviews_url = f'{url}reviews/'
+        expected = client.get(reviews_url).json()['results']
+        plain = client.get(url).json()
+        with CaptureQueriesContext(connection) as plain_context:
+            client.get(url)
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url, data={'expand': 'reviews'})
+        assert response.status_code == 200
+        data = response.json()
+        assert data['reviews'] == expected, (
+            'Проверьте, что `?expand=reviews` встраивает последние отзывы так же, '
+            'как `/api/v1/titles/{title_id}/reviews/`'
+        )
+        assert 'reviews' not in plain
+        assert {key: value for key, value in data.items() if key != 'reviews'} == plain
+        assert len(context.captured_queries) == len(plain_context.captured_queries) + 1, (
+            'Проверьте, что отзывы с авторами загружаются одним дополнительным запросом'
+        )
+
+        data = client.get(url, data={'expand': 'reviews:2'}).json()
+        assert data['reviews'] == expected[:2], (
+            'Проверьте, что `?expand=reviews:N` ограничивает число отзывов'
+        )
+        for expand in ('reviews:0', 'reviews:100', 'reviews:x', 'comments'):
+            response = client.get(url, data={'expand': expand})
+            assert response.status_code == 400, (
+                f'Проверьте, что `?expand={expand}` возвращает ошибку 400'
+            )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_expand_etag(self, client, admin_client, admin):
+        reviews, titles, _, _ = create_reviews(admin_client, admin)
+        url = f'/api/v1/titles/{titles[0]["id"]}/'
+        etag = client.get(url, data={'expand': 'reviews'})['ETag']
+        plain_etag = client.get(url)['ETag']
+        admin_client.patch(f'{url}reviews/{reviews[0]["id"]}/', data={'text': 'Новый текст'})
+        response = client.get(url, data={'expand': 'reviews'}, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200, (
+            'Проверьте, что ETag `?expand=reviews` меняется при изменении отзывов'
+        )
+        assert client.get(url, HTTP_IF_NONE_MATCH=plain_etag).status_code == 200
@@ -0,0 +1,70 @@
+import csv
+import io
+import json
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .common import create_titles
+
+
+def content(response):
+    return b''.join(response.streaming_content).decode()
+
+
+class Test24TitlesExport:
+    url = '/api/v1/titles/export/'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_export_formats(self, client, user_client, admin_client):
+        create_titles(admin_client)
+        assert client.get(self.url).status_code == 401
+        assert user_client.get(self.url).status_code == 403, (
+            'Проверьте, что выгрузка каталога доступна только администратору'
+        )
+        response = admin_client.get(self.url)
+        assert response.status_code == 200
+        assert response.streaming, 'Проверьте, что выгрузка отдается потоком'
+        assert response['Content-Type'] == 'application/x-ndjson'
+        rows = [json.loads(line) for line in content(response).splitlines()]
+        titles = admin_client.get('/api/v1/titles/').json()['results']
+        assert sorted(rows, key=lambda row: row['id']) == sorted(titles, key=lambda row: row['id']), (
+            'Проверьте, что строки NDJSON совпадают с представлением `/api/v1/titles/`'
+        )
+        assert [row['id'] for row in rows] == sorted(row['id'] for row in rows)
+
+        response = admin_client.get(self.url, data={'export_format': 'csv', 'category': 'films'})
+        assert response['Content-Type'].startswith('text/csv')
+        rows = list(csv.DictReader(io.StringIO(content(response))))
+        assert len(rows) == 1
+        assert rows[0]['name'] == 'Поворот туда'
+        assert rows[0]['genre'] == 'horror,comedy' and rows[0]['category'] == 'films'
+
+        response = admin_client.get(self.url, data={'fields': 'id,name'})
+        assert all(set(json.loads(line)) == {'id', 'name'} for line in content(response).splitlines())
+        assert admin_client.get(self.url, data={'export_format': 'xml'}).status_code == 400
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_export_chunks(self, admin_client, monkeypatch):
+        from api import export
+        from reviews.models import Title
+        create_titles(admin_client)
+        Title.objects.bulk_create(
+            Title(name=f'Выгрузка {index}', year=2000, description='') for index in range(9))
+        monkeypatch.setattr(export, 'EXPORT_CHUNK_SIZE', 4)
+        response = admin_client.get(self.url)
+        with CaptureQueriesContext(connection) as context:
+            lines = content(response).splitlines()
+        assert len(lines) == 11
+        assert len({json.loads(line)['id'] for line in lines}) == 11
+        title_queries = [
+            query for query in context.captured_queries
+            if 'FROM "reviews_title"' in query['sql'] and 'LIMIT 4' in query['sql']
+        ]
+        assert len(title_queries) == 3, (
+            'Проверьте, что выгрузка читает произведения порциями'
+        )
+        assert len(context.captured_queries) <= 6, (
+            'Проверьте, что жанры загружаются одним запросом на порцию'
+        )
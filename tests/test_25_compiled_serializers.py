@@ -0,0 +1,75 @@
+import pytest
+from django.core.management import call_command
+from django.test.utils import override_settings
+from rest_framework.renderers import JSONRenderer
+
+from .common import create_comments
+
+
+def render_both(serializer):
+    with override_settings(COMPILED_SERIALIZERS=True):
+        compiled = JSONRenderer().render(serializer.data)
+    del serializer._data
+    plain = JSONRenderer().render(serializer.data)
+    return compiled, plain
+
+
+class Test25CompiledSerializers:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_identical_output(self, admin_client, admin):
+        from api.serializers import (CategorySerializer, CommentSerializer,
+                                     GenreSerializer, ReviewSerializer,
+                                     TitleReadSerializer)
+        from reviews.models import Category, Comment, Genre, Review, Title
+        create_comments(admin_client, admin)
+        Title.objects.create(name='Без категории', year=1999)
+        for serializer_class, model in (
+            (TitleReadSerializer, Title),
+            (ReviewSerializer, Review),
+            (CommentSerializer, Comment),
+            (CategorySerializer, Category),
+            (GenreSerializer, Genre),
+        ):
+            serializer = serializer_class(
+                model.objects.order_by('id'), many=True)
+            compiled, plain = render_both(serializer)
+            assert compiled == plain, (
+                f'Проверьте, что {serializer_class.__name__} с быстрым '
+                'представлением выводит то же, что и DRF'
+            )
+        serializer = TitleReadSerializer(Title.objects.order_by('id'), many=True)
+        for name in ('description', 'category'):
+            serializer.child.fields.pop(name)
+        compiled, plain = render_both(serializer)
+        assert compiled == plain and b'description' not in compiled
+        assert len(TitleReadSerializer._compiled_plans) == 2, (
+            'Проверьте, что план строится один раз на класс и набор полей'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_api_output(self, admin_client, admin):
+        from api.serializers import TitleReadSerializer
+        comments, reviews, titles, _, _ = create_comments(admin_client, admin)
+        urls = [
+            '/api/v1/titles/',
+            f'/api/v1/titles/{titles[0]["id"]}/',
+            f'/api/v1/titles/{titles[0]["id"]}/reviews/',
+            f'/api/v1/titles/{titles[0]["id"]}/reviews/{reviews[0]["id"]}/comments/',
+            '/api/v1/categories/',
+            '/api/v1/genres/',
+        ]
+        TitleReadSerializer.__dict__.get('_compiled_plans', {}).clear()
+        plain = [admin_client.get(url).content for url in urls]
+        assert not TitleReadSerializer.__dict__.get('_compiled_plans'), (
+            'Проверьте, что быстрое представление выключено по умолчанию'
+        )
+        with override_settings(COMPILED_SERIALIZERS=True):
+            compiled = [admin_client.get(url).content for url in urls]
+        assert compiled == plain
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_benchmark_command(self, capsys):
+        call_command('benchmark_serializers', titles=20, repeat=1)
+        out = capsys.readouterr().out
+        assert out.count('output identical') == 3
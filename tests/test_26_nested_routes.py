@@ -0,0 +1,67 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .common import auth_client, create_comments
+
+
+def parent_queries(context, table):
+    return [
+        query['sql'] for query in context.captured_queries
+        if query['sql'].startswith('SELECT')
+        and f'FROM "{table}" WHERE' in query['sql']
+        and f'"{table}"."id" =' in query['sql']
+    ]
+
+
+class Test26NestedRoutes:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_single_parent_query(self, admin_client, admin):
+        from django.contrib.auth import get_user_model
+        comments, reviews, titles, _, _ = create_comments(admin_client, admin)
+        title_id, review_id = titles[1]['id'], reviews[0]['id']
+        url = f'/api/v1/titles/{title_id}/reviews/'
+        requests = (
+            ('get', url, {}, 200),
+            ('post', url, {'text': 'Отзыв', 'score': 6}, 201),
+        )
+        for method, request_url, data, status_code in requests:
+            with CaptureQueriesContext(connection) as context:
+                response = getattr(admin_client, method)(request_url, data=data)
+            assert response.status_code == status_code
+            assert len(parent_queries(context, 'reviews_title')) == 1, (
+                f'Проверьте, что `{method.upper()} {request_url}` загружает '
+                'произведение одним запросом'
+            )
+
+        user = get_user_model().objects.create(
+            username='commenter', email='commenter@yamdb.fake')
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/{review_id}/comments/'
+        for method, data, status_code in (
+            ('get', {}, 200), ('post', {'text': 'Комментарий'}, 201),
+        ):
+            with CaptureQueriesContext(connection) as context:
+                response = getattr(auth_client(user), method)(url, data=data)
+            assert response.status_code == status_code
+            assert len(parent_queries(context, 'reviews_review')) == 1, (
+                f'Проверьте, что `{method.upper()} {url}` проверяет цепочку '
+                'произведение - отзыв одним запросом'
+            )
+            assert not parent_queries(context, 'reviews_title')
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_chain_mismatch(self, admin_client, admin):
+        comments, reviews, titles, _, _ = create_comments(admin_client, admin)
+        url = (
+            f'/api/v1/titles/{titles[1]["id"]}/reviews/{reviews[0]["id"]}'
+            '/comments/'
+        )
+        assert admin_client.get(url).status_code == 404, (
+            'Проверьте, что отзыв чужого произведения дает 404'
+        )
+        response = admin_client.post(url, data={'text': 'Комментарий'})
+        assert response.status_code == 404
+        assert admin_client.get(
+            f'{url}{comments[0]["id"]}/').status_code == 404
+        assert admin_client.get('/api/v1/titles/100500/reviews/').status_code == 404
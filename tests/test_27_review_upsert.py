@@ -0,0 +1,98 @@
+import pytest
+from django.db import IntegrityError, connection
+from django.test.utils import CaptureQueriesContext
+
+from .common import auth_client, create_reviews
+
+
+class Test27ReviewUpsert:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_upsert(self, client, admin_client, admin):
+        from reviews.models import Review
+        reviews, titles, user, _ = create_reviews(admin_client, admin)
+        title_id = titles[1]['id']
+        url = f'/api/v1/titles/{title_id}/reviews/mine/'
+        user_client = auth_client(user)
+        assert client.put(url, data={'text': 'Отзыв', 'score': 5}).status_code == 401
+
+        response = user_client.put(url, data={'text': 'Отзыв', 'score': 5})
+        assert response.status_code == 201, (
+            'Проверьте, что PUT на `reviews/mine/` создает отзыв и возвращает 201'
+        )
+        review_id = response.json()['id']
+        assert response.json()['author'] == user.username
+        response = user_client.put(url, data={'text': 'Передумал', 'score': 9})
+        assert response.status_code == 200, (
+            'Проверьте, что повторный PUT на `reviews/mine/` заменяет отзыв и возвращает 200'
+        )
+        assert response.json()['id'] == review_id
+        assert response.json()['text'] == 'Передумал'
+        assert Review.objects.filter(title_id=title_id, author=user).count() == 1
+        assert admin_client.get(f'/api/v1/titles/{title_id}/').json()['rating'] == 9, (
+            'Проверьте, что замена отзыва пересчитывает рейтинг произведения'
+        )
+        assert user_client.put(url, data={'score': 7}).status_code == 400
+        assert user_client.put(
+            '/api/v1/titles/100500/reviews/mine/',
+            data={'text': 'Отзыв', 'score': 5}).status_code == 404
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_duplicate_without_precheck(self, admin_client, admin):
+        reviews, titles, user, _ = create_reviews(admin_client, admin)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        with CaptureQueriesContext(connection) as context:
+            response = auth_client(user).post(url, data={'text': 'Еще', 'score': 2})
+        assert response.status_code == 400
+        assert list(response.json()) == ['non_field_errors'], (
+            'Проверьте, что повторный отзыв по-прежнему дает ошибку non_field_errors'
+        )
+        queries = [query['sql'] for query in context.captured_queries]
+        insert = next(
+            index for index, sql in enumerate(queries)
+            if sql.startswith('INSERT INTO "reviews_review"'))
+        assert not [
+            sql for sql in queries[:insert]
+            if sql.startswith('SELECT') and 'FROM "reviews_review"' in sql
+        ], 'Проверьте, что повторный отзыв определяется ограничением, без запроса exists() перед вставкой'
+        response = auth_client(user).post(
+            f'/api/v1/titles/{titles[1]["id"]}/reviews/', data={'text': 'Еще', 'score': 2})
+        assert response.status_code == 201
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_other_integrity_errors(self, admin_client, admin, monkeypatch):
+        from rest_framework.serializers import ModelSerializer
+        reviews, titles, user, _ = create_reviews(admin_client, admin)
+
+        def broken_create(serializer, validated_data):
+            raise IntegrityError('NOT NULL constraint failed: reviews_review.text')
+        monkeypatch.setattr(ModelSerializer, 'create', broken_create)
+        with pytest.raises(IntegrityError):
+            auth_client(user).post(
+                f'/api/v1/titles/{titles[1]["id"]}/reviews/', data={'text': 'Еще', 'score': 2})
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_upsert_concurrent_delete(self, admin_client, admin, monkeypatch):
+        from api.serializers import ReviewSerializer
+        from reviews.models import Review
+        reviews, titles, user, _ = create_reviews(admin_client, admin)
+        title_id = titles[0]['id']
+        insert = ReviewSerializer.insert
+        calls = []
+
+        def insert_then_delete(serializer, data):
+            calls.append(data)
+            try:
+                return insert(serializer, data)
+            except IntegrityError:
+                # Параллельный запрос удаляет отзыв после неудачной вставки
+                Review.objects.filter(title_id=title_id, author=user).delete()
+                raise
+        monkeypatch.setattr(ReviewSerializer, 'insert', insert_then_delete)
+        response = auth_client(user).put(
+            f'/api/v1/titles/{title_id}/reviews/mine/', data={'text': 'Заново', 'score': 3})
+        assert response.status_code == 201, (
+            'Проверьте, что удаленный параллельно отзыв создается заново, а не дает ошибку 500'
+        )
+        assert len(calls) == 2
+        assert Review.objects.get(title_id=title_id, author=user).text == 'Заново'
@@ -0,0 +1,138 @@
+import pytest
+from django.core.management import CommandError, call_command
+
+from .common import auth_client, create_comments
+
+
+class Test28Counters:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_counters_in_responses(self, admin_client, admin):
+        comments, reviews, titles, user, moderator = create_comments(admin_client, admin)
+        title_url = f'/api/v1/titles/{titles[0]["id"]}/'
+        reviews_url = f'{title_url}reviews/'
+        assert admin_client.get(title_url).json()['reviews_count'] == 3, (
+            'Проверьте, что в произведении выводится количество отзывов `reviews_count`'
+        )
+        assert admin_client.get(f'/api/v1/titles/{titles[1]["id"]}/').json()['reviews_count'] == 0
+        review = admin_client.get(f'{reviews_url}{reviews[0]["id"]}/').json()
+        assert review['comments_count'] == 3, (
+            'Проверьте, что в отзыве выводится количество комментариев `comments_count`'
+        )
+        etag = admin_client.get(reviews_url)['ETag']
+        comments_url = f'{reviews_url}{reviews[0]["id"]}/comments/'
+        admin_client.delete(f'{comments_url}{comments[0]["id"]}/')
+        response = admin_client.get(reviews_url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200, (
+            'Проверьте, что изменение комментариев меняет ETag списка отзывов'
+        )
+        counts = {review['id']: review['comments_count'] for review in response.json()['results']}
+        assert counts[reviews[0]['id']] == 2
+
+        response = admin_client.patch(f'{reviews_url}{reviews[0]["id"]}/', data={'score': 8})
+        assert response.status_code == 200
+        assert response.json()['comments_count'] == 2
+        response = auth_client(user).post(
+            f'{reviews_url}{reviews[2]["id"]}/comments/', data={'text': 'Еще'})
+        assert response.status_code == 201
+        assert admin_client.get(f'{reviews_url}{reviews[2]["id"]}/').json()['comments_count'] == 1
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_cascades_and_repair(self, admin_client, admin):
+        from reviews.models import Review
+        comments, reviews, titles, user, moderator = create_comments(admin_client, admin)
+        review_id = reviews[0]['id']
+        moderator.delete()
+        assert Review.objects.get(pk=review_id).comments_count == 2, (
+            'Проверьте, что удаление автора комментария уменьшает счетчик отзыва'
+        )
+        user.delete()
+        assert Review.objects.get(pk=review_id).comments_count == 1
+        title_url = f'/api/v1/titles/{titles[0]["id"]}/'
+        assert admin_client.get(title_url).json()['reviews_count'] == 1
+
+        Review.objects.filter(pk=review_id).update(comments_count=7)
+        with pytest.raises(CommandError):
+            call_command('rebuild_aggregates', '--check')
+        call_command('rebuild_aggregates')
+        assert Review.objects.get(pk=review_id).comments_count == 1, (
+            'Проверьте, что команда rebuild_aggregates пересчитывает comments_count'
+        )
+        call_command('rebuild_aggregates', '--check')
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_review_cascade_queries(self, admin_client, admin):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from reviews.models import Comment, Review
+        comments, reviews, titles, user, moderator = create_comments(admin_client, admin)
+        query_counts = []
+        for review_id, count in ((reviews[1]['id'], 1), (reviews[2]['id'], 6)):
+            review = Review.objects.get(pk=review_id)
+            Comment.objects.bulk_create(
+                Comment(author=admin, review=review, text=f'{index}') for index in range(count))
+            with CaptureQueriesContext(connection) as context:
+                review.delete()
+            query_counts.append(len(context.captured_queries))
+        assert query_counts[0] == query_counts[1], (
+            'Проверьте, что удаление отзыва не выполняет запросов для каждого комментария'
+        )
+        comments_url = f'/api/v1/titles/{titles[0]["id"]}/reviews/{reviews[0]["id"]}/comments/'
+        admin_client.delete(f'{comments_url}{comments[0]["id"]}/')
+        assert Review.objects.get(pk=reviews[0]['id']).comments_count == 2, (
+            'Проверьте, что удаление отдельного комментария по-прежнему уменьшает счетчик'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_save_keeps_normal_semantics(self, admin_client, admin):
+        from reviews.models import Review
+        comments, reviews, titles, user, moderator = create_comments(admin_client, admin)
+        review = Review.objects.get(pk=reviews[0]['id'])
+        Review.objects.filter(pk=review.pk).delete()
+        review.save()
+        assert Review.objects.filter(pk=review.pk).exists(), (
+            'Проверьте, что save() удаленного отзыва вставляет его заново, как обычно в Django'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_05_comment_save_is_atomic(self, admin_client, admin, monkeypatch):
+        from reviews import signals
+        from reviews.models import Comment, Review
+        comments, reviews, titles, user, moderator = create_comments(admin_client, admin)
+        review = Review.objects.get(pk=reviews[0]['id'])
+
+        def fail(comment):
+            raise RuntimeError
+
+        monkeypatch.setattr(signals, 'bump_comment_versions', fail)
+        with pytest.raises(RuntimeError):
+            Comment(author=admin, review=review, text='Новый').save()
+        assert not Comment.objects.filter(text='Новый').exists(), (
+            'Проверьте, что комментарий, счетчик и версии сохраняются в одной транзакции'
+        )
+        assert Review.objects.get(pk=review.pk).comments_count == 3
+
+    @pytest.mark.django_db(transaction=True)
+    def test_06_failed_review_delete(self, admin_client, admin):
+        from django.db.models.signals import post_delete
+        from reviews.models import Comment, Review
+        comments, reviews, titles, user, moderator = create_comments(admin_client, admin)
+        review = Review.objects.get(pk=reviews[0]['id'])
+
+        def fail(**kwargs):
+            raise RuntimeError
+
+        # Каскад прерывается между pre_delete и post_delete отзыва
+        post_delete.connect(fail, sender=Comment)
+        try:
+            with pytest.raises(RuntimeError):
+                review.delete()
+        finally:
+            post_delete.disconnect(fail, sender=Comment)
+        assert Review.objects.get(pk=review.pk).comments_count == 3
+        comments_url = f'/api/v1/titles/{titles[0]["id"]}/reviews/{review.pk}/comments/'
+        admin_client.delete(f'{comments_url}{comments[0]["id"]}/')
+        assert Review.objects.get(pk=review.pk).comments_count == 2, (
+            'Проверьте, что неудачное удаление отзыва не мешает обновлять счетчик '
+            'при удалении его комментариев'
+        )
@@ -0,0 +1,80 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .common import auth_client, create_comments
+
+
+def user_queries(context):
+    # Пользователь для аутентификации загружается целиком
+    return [
+        query['sql'] for query in context.captured_queries
+        if '"users_user"' in query['sql']
+        and '"users_user"."password"' not in query['sql']
+    ]
+
+
+class Test29AuthorCache:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_batch_and_cache(self, client, admin_client, admin):
+        from reviews import authors
+        comments, reviews, titles, user, moderator = create_comments(admin_client, admin)
+        authors.cache.invalidate()
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        client.get(url)
+        authors.cache.usernames.clear()
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url)
+        assert {review['author'] for review in response.json()['results']} == {
+            admin.username, user.username, moderator.username}
+        queries = user_queries(context)
+        assert len(queries) == 1 and ' IN (' in queries[0], (
+            'Проверьте, что авторы страницы загружаются одним запросом с IN'
+        )
+        comments_url = f'{url}{reviews[0]["id"]}/comments/'
+        with CaptureQueriesContext(connection) as context:
+            client.get(url)
+            response = client.get(comments_url)
+        assert {comment['author'] for comment in response.json()['results']} == {
+            admin.username, user.username, moderator.username}
+        assert not user_queries(context), (
+            'Проверьте, что авторы отзывов и комментариев берутся из общего кэша'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_username_change(self, client, admin_client, admin):
+        comments, reviews, titles, user, moderator = create_comments(admin_client, admin)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/{reviews[1]["id"]}/'
+        assert client.get(url).json()['author'] == user.username
+        response = auth_client(user).patch('/api/v1/users/me/', data={'username': 'renamed'})
+        assert response.status_code == 200
+        assert client.get(url).json()['author'] == 'renamed', (
+            'Проверьте, что смена username через `/users/me/` сбрасывает кэш авторов'
+        )
+        response = admin_client.patch('/api/v1/users/renamed/', data={'username': 'again'})
+        assert response.status_code == 200
+        assert client.get(url).json()['author'] == 'again', (
+            'Проверьте, что смена username администратором сбрасывает кэш авторов'
+        )
+
+        from reviews import authors, versions
+        from reviews.models import User, Version
+        # Смена имени в другом процессе: без сигналов этого процесса
+        User.objects.filter(pk=user.pk).update(username='elsewhere')
+        Version.objects.filter(key=versions.USERS).update(token='other')
+        authors.cache.checked_at -= authors.VERSION_CHECK_INTERVAL
+        assert client.get(url).json()['author'] == 'elsewhere', (
+            'Проверьте, что кэш авторов сверяется с общей версией USERS'
+        )
+
+    def test_03_lru_bound(self):
+        from reviews.authors import AuthorCache
+        cache = AuthorCache(max_size=2)
+        cache.version, cache.checked_at = 'fixed', float('inf')
+        cache.store([(1, 'first'), (2, 'second')])
+        assert cache.get(1) == 'first'
+        cache.store([(3, 'third')])
+        assert list(cache.usernames) == [1, 3], (
+            'Проверьте, что кэш авторов вытесняет давно не использованные записи'
+        )
@@ -0,0 +1,88 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+
+def obtain_token(user):
+    from django.contrib.auth.tokens import default_token_generator
+    response = APIClient().post('/api/v1/auth/token/', data={
+        'username': user.username,
+        'confirmation_code': default_token_generator.make_token(user),
+    })
+    assert response.status_code == 200
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {response.json()["token"]}')
+    return client, response.json()['token']
+
+
+class Test30TokenClaims:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_no_user_query(self, user):
+        from rest_framework_simplejwt.tokens import AccessToken
+        client, token = obtain_token(user)
+        claims = AccessToken(token)
+        assert claims['role'] == 'user' and claims['user_version'], (
+            'Проверьте, что токен содержит роль и версию пользователя'
+        )
+        client.get('/api/v1/categories/')
+        with CaptureQueriesContext(connection) as context:
+            response = client.post('/api/v1/categories/', data={'name': 'Кино', 'slug': 'cinema'})
+        assert response.status_code == 403
+        assert not [
+            query for query in context.captured_queries
+            if '"users_user"' in query['sql']
+        ], 'Проверьте, что пользователь с актуальным токеном не загружается из БД'
+
+        response = client.get('/api/v1/users/me/')
+        assert response.status_code == 200
+        assert response.json()['bio'] == 'user bio', (
+            'Проверьте, что `/users/me/` возвращает профиль из БД'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_role_change_is_immediate(self, admin_client, user):
+        client, _ = obtain_token(user)
+        data = {'name': 'Кино', 'slug': 'cinema'}
+        assert client.post('/api/v1/categories/', data=data).status_code == 403
+        response = admin_client.patch(f'/api/v1/users/{user.username}/', data={'role': 'admin'})
+        assert response.status_code == 200
+        assert client.post('/api/v1/categories/', data=data).status_code == 201, (
+            'Проверьте, что повышение роли действует для уже выданного токена'
+        )
+        admin_client.patch(f'/api/v1/users/{user.username}/', data={'role': 'user'})
+        response = client.post('/api/v1/categories/', data={'name': 'Книги', 'slug': 'books'})
+        assert response.status_code == 403, (
+            'Проверьте, что понижение роли действует для уже выданного токена'
+        )
+        user.refresh_from_db()
+        user.is_active = False
+        user.save()
+        assert client.get('/api/v1/categories/').status_code == 401
+        user.delete()
+        assert client.get('/api/v1/categories/').status_code == 401
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_changes_from_other_processes(self, admin_client, user):
+        from reviews import versions
+        from reviews.models import User, Version
+        User.objects.filter(pk=user.pk).update(role='admin')
+        client, _ = obtain_token(user)
+        data = {'name': 'Кино', 'slug': 'cinema'}
+        assert client.post('/api/v1/categories/', data=data).status_code == 201
+        # Понижение роли в другом процессе: без сигналов этого процесса
+        User.objects.filter(pk=user.pk).update(role='user')
+        Version.objects.filter(key=versions.user(user.pk)).update(token='other')
+        response = client.post('/api/v1/categories/', data={'name': 'Книги', 'slug': 'books'})
+        assert response.status_code == 403, (
+            'Проверьте, что понижение роли в другом процессе действует для уже выданного токена'
+        )
+        User.objects.filter(pk=user.pk).update(role='admin')
+        client, _ = obtain_token(user)
+        User.objects.filter(pk=user.pk).update(role='user')
+        Version.objects.all().delete()
+        response = client.post('/api/v1/categories/', data={'name': 'Книги', 'slug': 'books'})
+        assert response.status_code == 403, (
+            'Проверьте, что без подтвержденной версии роль берется из БД'
+        )
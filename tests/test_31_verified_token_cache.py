@@ -0,0 +1,57 @@
+import time
+
+import pytest
+from django.core.management import call_command
+from rest_framework.test import APIClient
+
+
+class Test31VerifiedTokenCache:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_cache_hit_and_expiry(self, user, monkeypatch):
+        from api import authentication
+        from rest_framework_simplejwt.tokens import AccessToken
+        token = authentication.ClaimsAccessToken.for_user(user)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        assert client.get('/api/v1/users/me/').status_code == 200
+
+        decoded = []
+        original_init = AccessToken.__init__
+
+        def counting_init(self, *args, **kwargs):
+            decoded.append(args)
+            original_init(self, *args, **kwargs)
+        monkeypatch.setattr(AccessToken, '__init__', counting_init)
+        for _ in range(3):
+            assert client.get('/api/v1/users/me/').status_code == 200
+        assert not decoded, (
+            'Проверьте, что повторный запрос с тем же токеном не проверяет подпись заново'
+        )
+
+        # В момент exp запись кэша уже недействительна, и токен проверяется
+        # заново (по настоящим часам он еще действителен)
+        monkeypatch.setattr(authentication.time, 'time', lambda: token['exp'])
+        assert client.get('/api/v1/users/me/').status_code == 200
+        assert decoded, 'Проверьте, что кэш не отдает токен в момент его exp'
+        monkeypatch.undo()
+
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}x')
+        assert client.get('/api/v1/users/me/').status_code == 401
+
+    def test_02_bounded(self):
+        from api.authentication import VerifiedTokenCache
+        cache = VerifiedTokenCache(max_size=2)
+        exp = time.time() + 60
+        for digest in (b'a', b'b', b'c'):
+            cache.add(digest, {'exp': exp})
+        assert cache.get(b'a') is None and cache.get(b'c') == {'exp': exp}, (
+            'Проверьте, что кэш токенов ограничен по размеру'
+        )
+        cache.add(b'd', {'exp': time.time() - 1})
+        assert cache.get(b'd') is None
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_benchmark_command(self, capsys):
+        call_command('benchmark_authentication', requests=10, repeat=1)
+        assert capsys.readouterr().out.count('us per request') == 3
@@ -0,0 +1,169 @@
+from datetime import timedelta
+from smtplib import SMTPException
+
+import pytest
+from django.core import mail
+from django.core.management import call_command
+
+
+def signup(client, index):
+    return client.post('/api/v1/auth/signup/', data={
+        'username': f'outbox_user_{index}', 'email': f'outbox{index}@yamdb.fake'})
+
+
+class Test32EmailOutbox:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_signup_writes_outbox(self, client):
+        from users.models import OutboxMessage
+        outbox_before = len(mail.outbox)
+        assert signup(client, 1).status_code == 200
+        assert len(mail.outbox) == outbox_before, (
+            'Проверьте, что регистрация не отправляет письмо в запросе'
+        )
+        message = OutboxMessage.objects.get()
+        assert message.to == 'outbox1@yamdb.fake' and 'confirmation_code' in message.body
+        assert message.body.endswith('confirmation_code = {confirmation_code}'), (
+            'Проверьте, что код подтверждения не хранится в outbox'
+        )
+
+        response = client.post('/api/v1/auth/signup/', data={
+            'username': 'outbox_user_1', 'email': 'other@yamdb.fake'})
+        assert response.status_code == 400
+        assert OutboxMessage.objects.count() == 1, (
+            'Проверьте, что письмо записывается в одной транзакции с пользователем'
+        )
+
+        call_command('send_outbox')
+        assert len(mail.outbox) == outbox_before + 1
+        assert mail.outbox[-1].to == ['outbox1@yamdb.fake']
+        code = mail.outbox[-1].body.rsplit('confirmation_code = ', 1)[1]
+        response = client.post('/api/v1/auth/token/', data={
+            'username': 'outbox_user_1', 'confirmation_code': code})
+        assert response.status_code == 200, (
+            'Проверьте, что код подтверждения подставляется в письмо при отправке'
+        )
+        call_command('send_outbox')
+        assert len(mail.outbox) == outbox_before + 1, (
+            'Проверьте, что отправленное письмо не отправляется повторно'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_batches_over_one_connection(self, client, settings, tmp_path):
+        from users.models import OutboxMessage
+        settings.EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+        settings.EMAIL_FILE_PATH = str(tmp_path)
+        for index in range(5):
+            signup(client, index)
+        call_command('send_outbox', batch_size=2)
+        files = list(tmp_path.iterdir())
+        assert len(files) == 1, (
+            'Проверьте, что все пачки отправляются через одно соединение'
+        )
+        content = files[0].read_text()
+        assert all(f'outbox{index}@yamdb.fake' in content for index in range(5))
+        assert not OutboxMessage.objects.filter(sent_at__isnull=True).exists()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_retry_with_backoff(self, client, monkeypatch):
+        from django.core.mail.backends.locmem import EmailBackend
+        from django.utils import timezone
+
+        from users import outbox
+        from users.models import OutboxMessage
+        signup(client, 1)
+        original = EmailBackend.send_messages
+
+        def failing(self, messages):
+            raise SMTPException('relay is down')
+        monkeypatch.setattr(EmailBackend, 'send_messages', failing)
+        outbox_before = len(mail.outbox)
+        call_command('send_outbox')
+        message = OutboxMessage.objects.get()
+        assert message.sent_at is None and message.attempts == 1
+        assert 'relay is down' in message.last_error
+        assert message.next_attempt_at > timezone.now(), (
+            'Проверьте, что неудачное письмо откладывается'
+        )
+        call_command('send_outbox')
+        assert OutboxMessage.objects.get().attempts == 1
+
+        monkeypatch.setattr(EmailBackend, 'send_messages', original)
+        connection = mail.get_connection()
+        later = timezone.now() + outbox.retry_delay(1) + timedelta(seconds=1)
+        assert outbox.deliver_batch(connection, now=later) == (1, 0)
+        assert len(mail.outbox) == outbox_before + 1
+        assert outbox.retry_delay(20) == outbox.MAX_RETRY_DELAY
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_admin_hides_body(self, client, user_superuser):
+        from django.test import Client
+
+        from users.models import OutboxMessage
+        signup(client, 1)
+        message = OutboxMessage.objects.get()
+        staff_client = Client()
+        staff_client.force_login(user_superuser)
+        response = staff_client.get(f'/admin/users/outboxmessage/{message.pk}/change/')
+        assert response.status_code == 200
+        assert 'name="body"' not in response.content.decode(), (
+            'Проверьте, что текст письма не показывается в админке'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_05_writes_during_slow_send(self, client):
+        import threading
+
+        from django.core.mail.backends.locmem import EmailBackend
+        from django.db import connection
+        from django.test import Client
+
+        from users import outbox
+        from users.models import OutboxMessage
+        for index in range(2):
+            signup(client, index)
+        responses = []
+
+        def signup_in_thread():
+            try:
+                responses.append(signup(Client(), 10).status_code)
+            finally:
+                connection.close()
+
+        class SlowBackend(EmailBackend):
+            # Пока идет отправка, другой запрос регистрирует пользователя
+            def send_messages(self, messages):
+                assert not connection.in_atomic_block, (
+                    'Проверьте, что письма отправляются вне транзакции'
+                )
+                thread = threading.Thread(target=signup_in_thread)
+                thread.start()
+                thread.join()
+                return super().send_messages(messages)
+
+        assert outbox.deliver_batch(SlowBackend(), batch_size=2) == (2, 0)
+        assert responses == [200, 200], (
+            'Проверьте, что отправка писем не блокирует запись в БД'
+        )
+        assert OutboxMessage.objects.filter(sent_at__isnull=True).count() == 2
+        assert not OutboxMessage.objects.exclude(claim='').exists(), (
+            'Проверьте, что после отправки метка claim снимается'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_06_expired_claim(self, client):
+        from django.utils import timezone
+
+        from users import outbox
+        from users.models import OutboxMessage
+        signup(client, 1)
+        now = timezone.now()
+        assert [message.to for message in outbox.claim(10, now)] == ['outbox1@yamdb.fake']
+        assert outbox.claim(10, now) == [], (
+            'Проверьте, что взятое в отправку письмо не берет другой воркер'
+        )
+        later = now + outbox.CLAIM_TIMEOUT
+        assert outbox.deliver_batch(mail.get_connection(), now=later) == (1, 0), (
+            'Проверьте, что письма упавшего воркера отправляются после CLAIM_TIMEOUT'
+        )
+        assert OutboxMessage.objects.get().sent_at == later